@@ -0,0 +1,112 @@
+import os
+import shutil
+import argparse
+import tempfile
+import pandas as pd
+from datetime import datetime
+
+import replay_provider
+import ingest_metrics
+import filter_2_and_3 as f23
+
+# =======================
+# CONFIG
+# =======================
+MODES = ["serial", "concurrent", "yahoo-batch"]
+
+
+def reset_state():
+    """Fresh token buckets and no journal / hedging, so every mode starts from the same state."""
+    f23.RATE_LIMITERS = {s: f23.TokenBucket(rate, burst) for s, (rate, burst) in f23.RATE_LIMITS.items()}
+    f23.JOURNAL = None
+    f23.HEDGE_AFTER = None
+    f23.RECHECK = False
+    f23.METRICS = ingest_metrics.RunMetrics()
+
+
+def run_mode(mode, coins, workers):
+    if mode == "serial":
+        return f23.run_serial(coins)
+    if mode == "concurrent":
+        return f23.run_concurrent(coins, workers)
+    return f23.run_yahoo_batched(coins, workers)
+
+
+def bench_mode(mode, coins, workers, stand_in_args):
+    """Run one ingestion mode against the stand-in in an empty scratch directory."""
+    cwd = os.getcwd()
+    scratch = tempfile.mkdtemp(prefix=f"bench-{mode}-")
+    try:
+        os.chdir(scratch)
+        os.makedirs(f23.HIST_DIR, exist_ok=True)
+        reset_state()
+        stand_in = replay_provider.StandIn(**stand_in_args)
+        stand_in.install(f23)
+
+        start = datetime.now()
+        results = run_mode(mode, coins, workers)
+        seconds = max((datetime.now() - start).total_seconds(), 1e-9)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    latencies = [x for s in f23.METRICS.sources.values() for x in s["latencies"]]
+    return {
+        "mode": mode,
+        "coins": len(results),
+        "seconds": round(seconds, 2),
+        "coins_per_min": round(len(results) / seconds * 60, 1),
+        "provider_calls": stand_in.stats["calls"],
+        "injected_429": stand_in.stats["injected_429"],
+        "p95_call_s": round(ingest_metrics.percentile(latencies, 0.95) or 0.0, 3),
+        "rate_limit_wait_s": round(sum(s["wait_seconds"] for s in f23.METRICS.sources.values()), 1),
+    }
+
+
+def bench_filter1(stand_in_args):
+    import filter_1
+    stand_in = replay_provider.StandIn(**stand_in_args)
+    stand_in.install_http()
+    start = datetime.now()
+    coins = filter_1.fetch_top_coins()
+    seconds = max((datetime.now() - start).total_seconds(), 1e-9)
+    return {"mode": "filter_1", "coins": len(coins), "seconds": round(seconds, 2),
+            "coins_per_min": round(len(coins) / seconds * 60, 1),
+            "provider_calls": stand_in.stats["calls"], "injected_429": stand_in.stats["injected_429"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingestion modes against recorded provider fixtures")
+    parser.add_argument("--fixtures", default=replay_provider.FIXTURE_DIR)
+    parser.add_argument("--coins", type=int, default=100, help="number of coins from top_1000_coins.csv")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--workers", type=int, default=f23.MAX_WORKERS)
+    parser.add_argument("--latency", type=float, default=0.2, help="stand-in latency per call (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of an injected 429 per call")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of an injected 429 (seconds)")
+    parser.add_argument("--no-rate-limit", action="store_true", help="disable the per-source token buckets")
+    parser.add_argument("--filter1", action="store_true", help="also replay Filter 1 market pages")
+    args = parser.parse_args()
+
+    replay_provider.FIXTURE_DIR = os.path.abspath(args.fixtures)
+    if args.no_rate_limit:
+        f23.RATE_LIMITS = {s: (1e9, 1e9) for s in f23.RATE_LIMITS}
+    coins = pd.read_csv(f23.COINS_CSV, dtype=str).head(args.coins)
+    stand_in_args = {
+        "latency": args.latency,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "retry_after": args.retry_after,
+    }
+
+    rows = [bench_mode(mode, coins, args.workers, stand_in_args) for mode in args.modes]
+    if args.filter1:
+        rows.append(bench_filter1(stand_in_args))
+
+    print("\n=== Ingestion benchmark (replayed providers) ===")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
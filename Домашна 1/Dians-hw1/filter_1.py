@@ -1,15 +1,19 @@
-import requests
-import pandas as pd
+import os
 import time
+import pandas as pd
 from datetime import datetime
 
+import http_client
+
 # === CONFIG ===
 OUTPUT_JSON = "top_1000_coins.json"
 OUTPUT_CSV = "top_1000_coins.csv"
 
 MIN_VOLUME_USD = 100000
 MAX_PAGES = 10  # 10 x 250 = 2500
-RETRY_DELAY = 15  # seconds to wait on rate limit
+PAGE_DELAY = 2.0  # seconds between two pages fetched from CoinGecko (same pace as filter_2_and_3)
+# Reuse cached CoinGecko pages within this window (seconds); 0 disables the cache
+CACHE_TTL = int(os.environ.get("FILTER1_CACHE_TTL", 0))
 
 
 def fetch_top_coins():
@@ -26,21 +30,12 @@ def fetch_top_coins():
             "sparkline": "false",
         }
 
-        success = False
-        for attempt in range(5):
-            response = requests.get(url, params=params)
-            if response.status_code == 200:
-                success = True
-                break
-            elif response.status_code == 429:
-                print(f"Rate limit hit (page {page}), waiting {RETRY_DELAY}s...")
-                time.sleep(RETRY_DELAY)
-            else:
-                print(f"Error fetching page {page}: {response.status_code}")
-                break
-
-        if not success:
-            print(f"Failed to fetch page {page} after retries. Skipping.")
+        # pooled session, Retry-After aware backoff on 429 and optional on-disk cache
+        response = http_client.get(url, params=params, cache_ttl=CACHE_TTL)
+        if not getattr(response, "from_cache", False) and page < MAX_PAGES:
+            time.sleep(PAGE_DELAY)
+        if response.status_code != 200:
+            print(f"Failed to fetch page {page} (status {response.status_code}). Skipping.")
             continue
 
         data = response.json()
@@ -61,7 +56,6 @@ def fetch_top_coins():
             })
 
         print(f"Page {page} fetched ({len(data)} coins)")
-        time.sleep(2)
 
     print(f"\nTotal coins fetched: {len(all_coins)}")
     return all_coins
@@ -101,6 +95,7 @@ def main():
 
     duration = datetime.now() - start
     print(f"\nCompleted in {duration.seconds} seconds.")
+    print(http_client.summary())
 
 
 if __name__ == "__main__":
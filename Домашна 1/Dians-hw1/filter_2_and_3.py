@@ -1,16 +1,30 @@
 import os
 import time
-import requests
+import argparse
+import functools
+import threading
 import pandas as pd
 import yfinance as yf
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FuturesTimeout
 from binance.client import Client as BinanceClient
 
+import manifest
+import http_client
+import history_store
+import source_affinity
+import negative_cache
+import run_journal
+import ingest_metrics
+import hourly_store
+import rollups
+
 # =======================
 # CONFIG
 # =======================
 COINS_CSV = "top_1000_coins.csv"
-HIST_DIR = "historical"
+HIST_DIR = history_store.HIST_DIR
 os.makedirs(HIST_DIR, exist_ok=True)
 
 BINANCE_API_KEY = ""
@@ -19,49 +33,228 @@ BINANCE_API_SECRET = ""
 SLEEP_SHORT = 0.1
 SLEEP_LONG = 2.0
 
+# Concurrent scheduler: number of coins processed at the same time
+MAX_WORKERS = 8
+
+# Batched Yahoo mode: max tickers per multi-ticker request
+YAHOO_BATCH_SIZE = 50
+
+# Default provider order; a symbol's last winning source is tried first (source_affinity.py)
+SOURCE_ORDER = ["yahoo", "binance", "coingecko"]
+SOURCE_LABELS = {"yahoo": "Yahoo Finance", "binance": "Binance Spot", "coingecko": "CoinGecko"}
+
+# Hedged mode: start the next source if the current one has not answered after N seconds (None = off)
+HEDGE_AFTER = None
+
+# Ignore the negative cache and re-check every coin (--recheck)
+RECHECK = False
+
+# Run journal of the current run (run_journal.py); set in main()
+JOURNAL = None
+
+# --hourly: how far back the first hourly download of a coin goes
+HOURLY_BACKFILL_DAYS = 30
+
+# Per-call provider metrics of the current run (replaced in main once the run id is known)
+METRICS = ingest_metrics.RunMetrics()
+
+# Token-bucket limits per source: (requests per second, burst size)
+RATE_LIMITS = {
+    "yahoo": (2.0, 4),
+    "binance": (10.0, 10),
+    "coingecko": (0.5, 1),
+}
+
 COINGECKO_URL = "https://api.coingecko.com/api/v3/coins/{id}/market_chart"
+# Reuse cached CoinGecko responses within this window (seconds); 0 disables the cache
+COINGECKO_CACHE_TTL = int(os.environ.get("COINGECKO_CACHE_TTL", 0))
 
 
 # =======================
 # LOGGING
 # =======================
+_log_lock = threading.Lock()
+
+
 def log(msg):
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    print(f"[{ts}] {msg}")
+    with _log_lock:
+        print(f"[{ts}] {msg}")
+
+
+# =======================
+# RATE LIMITING
+# =======================
+class TokenBucket:
+    """
+    Thread-safe token bucket. Each request takes one token; tokens refill
+    at `rate` per second up to `capacity`. acquire() blocks until a token is free.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    ingest_metrics.note_wait(waited)
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+RATE_LIMITERS = {source: TokenBucket(rate, burst) for source, (rate, burst) in RATE_LIMITS.items()}
+
+# yf.download collects its results in module-global state (yfinance.shared), so two calls
+# from different worker threads can swap or lose each other's frames: one call at a time
+_yahoo_lock = threading.Lock()
+
+# Extra threads for hedged requests (kept separate from the per-coin scheduler pool):
+# two per coin in flight (primary + backup), sized from --workers by set_hedge_workers()
+_hedge_pool = None
+_hedge_pool_lock = threading.Lock()
+
+
+def set_hedge_workers(workers):
+    """Called from main() before any coin is processed."""
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is not None:
+            _hedge_pool.shutdown(wait=False)
+        _hedge_pool = ThreadPoolExecutor(max_workers=2 * max(workers, 1))
+
+
+def hedge_pool():
+    """The hedge pool; sized for MAX_WORKERS coins if main() did not size it (e.g. benchmarks)."""
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=2 * MAX_WORKERS)
+        return _hedge_pool
 
 
 # =======================
 # FETCH FUNCTIONS
 # =======================
-def fetch_yahoo(symbol, since=None):
+def instrumented(source):
+    """Record latency, status, rows and retries of every call to the wrapped fetcher in METRICS."""
+    def wrap(fetch):
+        @functools.wraps(fetch)
+        def call(*args, **kwargs):
+            with METRICS.call(source) as c:
+                c.result = fetch(*args, **kwargs)
+            return c.result
+        return call
+    return wrap
+
+
+def to_epoch_ms(day):
+    """Midnight UTC of the given date as a millisecond timestamp (Binance start_str format)."""
+    return int(datetime.combine(day, datetime.min.time(), tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def hour_to_epoch_ms(hour):
+    """A naive UTC datetime as a millisecond timestamp."""
+    return int(hour.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def yahoo_range_args(since, until=None):
+    if since is None:
+        return {"period": "max"}
+    args = {"start": since.strftime("%Y-%m-%d")}
+    if until is not None:
+        # Yahoo's end date is exclusive
+        args["end"] = (until + timedelta(days=1)).strftime("%Y-%m-%d")
+    return args
+
+
+def clip_range(df, since=None, until=None):
+    if since is not None:
+        df = df[df["date"] >= since]
+    if until is not None:
+        df = df[df["date"] <= until]
+    return df
+
+
+def normalize_yahoo(df, since=None, until=None):
+    df = df.dropna(how="all")
+    if df.empty:
+        return None
+    df = df.reset_index()
+    df = df.rename(columns={
+        "Date": "date",
+        "Open": "open",
+        "High": "high",
+        "Low": "low",
+        "Close": "close",
+        "Volume": "volume"
+    })
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    df = df[["date", "open", "high", "low", "close", "volume"]]
+    return clip_range(df, since, until)
+
+
+@instrumented("yahoo")
+def fetch_yahoo(symbol, since=None, until=None):
     try:
-        df = yf.download(f"{symbol}-USD", period="max", interval="1d", progress=False, threads=False)
+        RATE_LIMITERS["yahoo"].acquire()
+        with _yahoo_lock:
+            df = yf.download(f"{symbol}-USD", interval="1d", progress=False, threads=False,
+                             **yahoo_range_args(since, until))
         if df is None or df.empty:
             return None
-        df = df.reset_index()
-        df = df.rename(columns={
-            "Date": "date",
-            "Open": "open",
-            "High": "high",
-            "Low": "low",
-            "Close": "close",
-            "Volume": "volume"
-        })
-        df["date"] = pd.to_datetime(df["date"]).dt.date
-        df = df[["date", "open", "high", "low", "close", "volume"]]
-        if since is not None:
-            df = df[df["date"] >= since]
-        return df
+        return normalize_yahoo(df, since, until)
     except Exception as e:
+        ingest_metrics.note(status="error")
         log(f"Yahoo error for {symbol}: {e}")
         return None
 
 
-def fetch_binance_spot(symbol, since=None):
+@instrumented("yahoo")
+def fetch_yahoo_batch(symbols, since=None):
+    """
+    Download several symbols in one multi-ticker request and split the result
+    back into per-symbol frames. Symbols without data map to None.
+    """
+    tickers = {f"{symbol}-USD": symbol for symbol in symbols}
+    results = {symbol: None for symbol in symbols}
     try:
+        RATE_LIMITERS["yahoo"].acquire()
+        with _yahoo_lock:
+            df = yf.download(list(tickers), interval="1d", group_by="ticker", progress=False, threads=True,
+                             **yahoo_range_args(since))
+        if df is None or df.empty:
+            return results
+        for ticker, symbol in tickers.items():
+            if ticker not in df.columns.get_level_values(0):
+                continue
+            results[symbol] = normalize_yahoo(df[ticker].copy(), since)
+    except Exception as e:
+        ingest_metrics.note(status="error")
+        log(f"Yahoo batch error for {len(symbols)} symbols: {e}")
+    return results
+
+
+@instrumented("binance")
+def fetch_binance_spot(symbol, since=None, until=None):
+    try:
+        RATE_LIMITERS["binance"].acquire()
         client = BinanceClient(BINANCE_API_KEY, BINANCE_API_SECRET)
         pair = f"{symbol.upper()}USDT"
-        klines = client.get_historical_klines(pair, BinanceClient.KLINE_INTERVAL_1DAY, "10 years ago UTC")
+        start = "10 years ago UTC" if since is None else to_epoch_ms(since)
+        end = None if until is None else to_epoch_ms(until + timedelta(days=1)) - 1
+        klines = client.get_historical_klines(pair, BinanceClient.KLINE_INTERVAL_1DAY, start, end)
         if not klines:
             return None
         df = pd.DataFrame(klines, columns=[
@@ -71,24 +264,54 @@ def fetch_binance_spot(symbol, since=None):
         df["date"] = pd.to_datetime(df["open_time"], unit="ms").dt.date
         df = df[["date", "open", "high", "low", "close", "volume"]]
         df = df.astype({"open": float, "high": float, "low": float, "close": float, "volume": float})
-        if since is not None:
-            df = df[df["date"] >= since]
-        return df
+        return clip_range(df, since, until)
     except Exception as e:
+        ingest_metrics.note(status="error")
         log(f"Binance spot error for {symbol}: {e}")
         return None
 
 
-def fetch_coingecko(coin_id, since=None):
+@instrumented("binance")
+def fetch_binance_hourly(symbol, since):
+    """Closed 1h candles from `since` (naive UTC datetime) on; the still-open hour is left out."""
+    try:
+        RATE_LIMITERS["binance"].acquire()
+        client = BinanceClient(BINANCE_API_KEY, BINANCE_API_SECRET)
+        pair = f"{symbol.upper()}USDT"
+        klines = client.get_historical_klines(pair, BinanceClient.KLINE_INTERVAL_1HOUR, hour_to_epoch_ms(since))
+        if not klines:
+            return None
+        df = pd.DataFrame(klines, columns=[
+            "open_time", "open", "high", "low", "close", "volume",
+            "close_time", "q", "n", "tbb", "tbq", "ignore"
+        ])
+        df = df[df["close_time"] < int(time.time() * 1000)]
+        df["datetime"] = pd.to_datetime(df["open_time"], unit="ms")
+        # quote (USDT) volume, the unit of the Yahoo daily history these hours extend;
+        # "volume" of a kline is in units of the coin itself
+        df["volume"] = df["q"]
+        df = df[hourly_store.HOURLY_COLUMNS]
+        return df.astype({"open": float, "high": float, "low": float, "close": float, "volume": float})
+    except Exception as e:
+        ingest_metrics.note(status="error")
+        log(f"Binance hourly error for {symbol}: {e}")
+        return None
+
+
+@instrumented("coingecko")
+def fetch_coingecko(coin_id, since=None, until=None):
     try:
         url = COINGECKO_URL.format(id=coin_id)
-        r = requests.get(url, params={
+        # the token bucket is taken before every attempt, retries included
+        r = http_client.get(url, params={
             "vs_currency": "usd",
             "days": "365",
             "interval": "daily"
-        }, timeout=30)
+        }, timeout=30, cache_ttl=COINGECKO_CACHE_TTL, log=log, acquire=RATE_LIMITERS["coingecko"].acquire)
+        ingest_metrics.note(retries=r.retries)
 
         if r.status_code != 200:
+            ingest_metrics.note(status=f"http_{r.status_code}")
             return None
 
         data = r.json()
@@ -107,10 +330,9 @@ def fetch_coingecko(coin_id, since=None):
         df["volume"] = [v[1] for v in vols] if vols else None
 
         df = df[["date", "open", "high", "low", "close", "volume"]]
-        if since is not None:
-            df = df[df["date"] >= since]
-        return df
+        return clip_range(df, since, until)
     except Exception as e:
+        ingest_metrics.note(status="error")
         log(f"CoinGecko error: {e}")
         return None
 
@@ -118,27 +340,89 @@ def fetch_coingecko(coin_id, since=None):
 # =======================
 # TRY ALL SOURCES
 # =======================
-def try_all_sources(symbol, coin_id, since=None):
-    df = fetch_yahoo(symbol, since)
-    if df is not None and not df.empty:
-        log(f"Data source: Yahoo Finance for symbol {symbol}, rows fetched: {len(df)}")
-        return df
-    else:
-        log(f"Yahoo Finance returned no data or failed for symbol {symbol}")
+def fetch_from(source, symbol, coin_id, since=None, until=None):
+    if source == "yahoo":
+        return fetch_yahoo(symbol, since, until)
+    if source == "binance":
+        return fetch_binance_spot(symbol, since, until)
+    return fetch_coingecko(coin_id, since, until)
+
+
+def source_target(source, symbol, coin_id):
+    return f"coin_id {coin_id}" if source == "coingecko" else f"symbol {symbol}"
 
-    df = fetch_binance_spot(symbol, since)
-    if df is not None and not df.empty:
-        log(f"Data source: Binance Spot for symbol {symbol}, rows fetched: {len(df)}")
-        return df
-    else:
-        log(f"Binance Spot returned no data or failed for symbol {symbol}")
 
-    df = fetch_coingecko(coin_id, since)
+def fetch_hedged(primary, backup, symbol, coin_id, since=None, until=None):
+    """
+    Start the primary source; if it has not answered after HEDGE_AFTER seconds, start
+    the backup as well. Returns [(source, df), ...] for the sources that were decided,
+    first non-empty result first.
+    """
+    first = hedge_pool().submit(fetch_from, primary, symbol, coin_id, since, until)
+    try:
+        return [(primary, first.result(timeout=HEDGE_AFTER))]
+    except FuturesTimeout:
+        pass
+
+    log(f"{SOURCE_LABELS[primary]} slower than {HEDGE_AFTER}s for symbol {symbol}, hedging with {SOURCE_LABELS[backup]}")
+    second = hedge_pool().submit(fetch_from, backup, symbol, coin_id, since, until)
+    futures = {first: primary, second: backup}
+    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+    winner = done.pop()
+    df = winner.result()
     if df is not None and not df.empty:
-        log(f"Data source: CoinGecko for coin_id {coin_id}, rows fetched: {len(df)}")
-        return df
-    else:
-        log(f"CoinGecko returned no data or failed for coin_id {coin_id}")
+        return [(futures[winner], df)]
+    other = second if winner is first else first
+    return [(futures[winner], df), (futures[other], other.result())]
+
+
+def expects_data(since):
+    """
+    Whether a fetch from `since` on should return rows: a full download, or one starting
+    before yesterday (UTC). From yesterday on, no rows just means the coin is up to date.
+    """
+    return since is None or since < datetime.now(timezone.utc).date() - timedelta(days=1)
+
+
+def try_all_sources(symbol, coin_id, since=None, prefetched=None, until=None, affinity=True):
+    """
+    Sources are tried in SOURCE_ORDER, except that the source that last succeeded for
+    this symbol (source_affinity) goes first.
+    prefetched = {"yahoo": df or None} → reuse a batched Yahoo result instead of calling Yahoo again;
+    a prefetched frame with rows is used first, whatever the affinity says (it is already paid for)
+    affinity=False → use the affinity order but don't update it (gap repair: a narrow old
+    range a source has no rows for says nothing about how it serves the coin's new days)
+    """
+    prefetched = prefetched or {}
+    remaining = source_affinity.ordered_sources(symbol, SOURCE_ORDER)
+    preferred = remaining[0]
+    ready = [s for s in remaining if prefetched.get(s) is not None and not prefetched[s].empty]
+    remaining = ready + [s for s in remaining if s not in ready]
+
+    while remaining:
+        source = remaining.pop(0)
+        if source in prefetched:
+            results = [(source, prefetched[source])]
+        elif HEDGE_AFTER and remaining and remaining[0] not in prefetched:
+            results = fetch_hedged(source, remaining[0], symbol, coin_id, since, until)
+            if len(results) > 1 or results[0][0] != source:
+                remaining.pop(0)
+        else:
+            results = [(source, fetch_from(source, symbol, coin_id, since, until))]
+
+        for source, df in results:
+            target = source_target(source, symbol, coin_id)
+            if df is not None and not df.empty:
+                log(f"Data source: {SOURCE_LABELS[source]} for {target}, rows fetched: {len(df)}")
+                df.attrs["source"] = source
+                if affinity:
+                    source_affinity.record_success(symbol, source)
+                return df
+            log(f"{SOURCE_LABELS[source]} returned no data or failed for {target}")
+            # an empty answer for a range that can't have rows yet is not a failure
+            if (affinity and source == preferred and expects_data(since)
+                    and source_affinity.record_failure(symbol, source)):
+                log(f"Demoted {SOURCE_LABELS[source]} as preferred source for {symbol}")
 
     log(f"No data found from any source for symbol {symbol} / coin_id {coin_id}")
     return None
@@ -148,100 +432,411 @@ def try_all_sources(symbol, coin_id, since=None):
 # FILTER 2
 # =======================
 def filter2_get_last_date(coin_id):
-    path = os.path.join(HIST_DIR, f"{coin_id}.csv")
-    if not os.path.exists(path):
-        log(f" - No CSV on disk for {coin_id}")
+    if not history_store.has_history(coin_id):
+        log(f" - No history on disk for {coin_id}")
         return None
+
+    # stale if the files changed outside the tool → rescanned below
+    entry = manifest.get_entry(coin_id, history_store.history_checksum(coin_id))
+    if entry is not None and entry["last_date"] is not None:
+        log(f" - Latest date for {coin_id}: {entry['last_date']} (manifest)")
+        return entry["last_date"]
+
+    return filter2_scan_history(coin_id)
+
+
+def filter2_scan_history(coin_id):
+    """Fallback: read the stored dates (base + delta) for max(date) and rebuild the coin's manifest entry."""
     try:
-        df = pd.read_csv(path)
-        if df.empty or "date" not in df.columns:
-            log(f" - CSV for {coin_id} is empty or has no 'date' column")
+        df = history_store.read_history(coin_id, columns=["date"])
+        if df is None or df.empty or "date" not in df.columns:
+            log(f" - History for {coin_id} is empty or has no 'date' column")
             return None
         df["date"] = pd.to_datetime(df["date"], errors='coerce').dt.date
         df = df.dropna(subset=['date'])
         if df.empty:
-            log(f" - CSV for {coin_id} has no valid dates after parsing")
+            log(f" - History for {coin_id} has no valid dates after parsing")
             return None
         last = df["date"].max()
         log(f" - Latest date for {coin_id}: {last}")
+        manifest.update_entry(coin_id, last, len(df), checksum=history_store.history_checksum(coin_id))
         return last
     except Exception as e:
-        log(f" - Exception reading {coin_id}.csv: {e}")
+        log(f" - Exception reading history for {coin_id}: {e}")
         return None
 
 
 # =======================
 # FILTER 3
 # =======================
-def filter3_download_missing(coin_id, symbol, last_date):
+def filter3_since(last_date):
+    return None if last_date is None else last_date + timedelta(days=1)
+
+
+def filter3_download_missing(coin_id, symbol, last_date, prefetched=None):
     """
     last_date = None → download full history
     last_date = date → download only from date + 1 day onward
     """
     if last_date is None:
         log(" - No existing history → full download")
-        df = try_all_sources(symbol, coin_id, since=None)
+        df = try_all_sources(symbol, coin_id, since=None, prefetched=prefetched)
         if df is None or df.empty:
-            log(" - No data found")
+            retry = negative_cache.record_empty(coin_id)
+            log(f" - No data found, next check after {retry:%Y-%m-%d %H:%M}")
             return False
         save_history(coin_id, df)
+        refresh_rollups(coin_id, full=True)
+        negative_cache.record_found(coin_id)
         return True
 
-    since = last_date + timedelta(days=1)
+    since = filter3_since(last_date)
     log(f" - Last date = {last_date}, need missing from {since}")
-    df = try_all_sources(symbol, coin_id, since=since)
+    df = try_all_sources(symbol, coin_id, since=since, prefetched=prefetched)
 
     if df is None or df.empty:
         log(" - No new rows")
         return True
 
     append_history(coin_id, df)
+    refresh_rollups(coin_id)
     return True
 
 
+def filter3_repair_gaps(coin_id, symbol):
+    """
+    Find holes inside the stored history and fetch exactly those date ranges,
+    so repair cost is proportional to the missing days, not to the full history.
+    Returns True when every gap was filled (or there were none).
+    """
+    df = history_store.read_history(coin_id, columns=["date"])
+    if df is None or df.empty:
+        log(f" - No history for {coin_id}, nothing to repair")
+        return True
+
+    gaps = history_store.find_gaps(df["date"])
+    if not gaps:
+        return True
+    missing = sum((end - start).days + 1 for start, end in gaps)
+    log(f" - {coin_id}: {len(gaps)} gaps, {missing} missing days")
+
+    filled_all = True
+    for start, end in gaps:
+        df_gap = try_all_sources(symbol, coin_id, since=start, until=end, affinity=False)
+        if df_gap is None or df_gap.empty:
+            log(f"   Gap {start} → {end} not available from any source")
+            filled_all = False
+            continue
+        append_history(coin_id, df_gap)
+        if len(df_gap) < (end - start).days + 1:
+            filled_all = False
+    return filled_all
+
+
 # =======================
 # SAVE / APPEND FUNCTIONS
 # =======================
 def save_history(coin_id, df):
-    path = os.path.join(HIST_DIR, f"{coin_id}.csv")
-    df.to_csv(path, index=False)
+    history_store.save_history(coin_id, df, df.attrs.get("source"))
     log(f"   Saved {coin_id} (full history, {len(df)} rows)")
 
 
 def append_history(coin_id, df_new):
-    path = os.path.join(HIST_DIR, f"{coin_id}.csv")
-    df_old = pd.read_csv(path)
-    df_old["date"] = pd.to_datetime(df_old["date"]).dt.date
-    df_new["date"] = pd.to_datetime(df_new["date"]).dt.date
+    """
+    Append-only: with the csv backend new rows go to historical/delta/<coin_id>.csv,
+    with the parquet backend to a new part file; history_store.py compacts later.
+    """
+    history_store.append_history(coin_id, df_new, df_new.attrs.get("source"))
+    log(f"   Appended {len(df_new)} new rows → {coin_id} ({history_store.STORAGE_BACKEND})")
+
 
-    combined = pd.concat([df_old, df_new], ignore_index=True)
-    combined = combined.drop_duplicates(subset="date").sort_values("date")
-    combined.to_csv(path, index=False)
-    log(f"   Appended {len(df_new)} new rows → {coin_id}.csv")
+def refresh_rollups(coin_id, full=False):
+    """Keep the week / month rollups of coins that have them in step with the daily history."""
+    if os.path.exists(rollups.rollup_path(coin_id, "week")):
+        rollups.update_coin(coin_id, full=full)
 
 
 # =======================
 # PIPE: FILTER 1 → FILTER 2 → FILTER 3
 # =======================
-def main():
-    start_time = datetime.now()
-    coins = pd.read_csv(COINS_CSV, dtype=str)
+def skip_unfetchable(i, total, coin_id, symbol):
+    """Negative cache: coins no provider had data for are skipped until their retry time (--recheck overrides)."""
+    if RECHECK or not negative_cache.should_skip(coin_id):
+        return False
+    log(f"[{i + 1}/{total}] {symbol} ({coin_id}) skipped, no data until {negative_cache.next_retry_at(coin_id):%Y-%m-%d %H:%M}")
+    return True
+
+
+def process_coin(i, total, coin_id, symbol, last_date=None, prefetched=None):
+    """Returns True / False for updated / failed, None when the coin was skipped."""
+    result = update_coin(i, total, coin_id, symbol, last_date, prefetched)
+    if JOURNAL is not None:
+        JOURNAL.record(coin_id, result)
+    return result
+
+
+def update_coin(i, total, coin_id, symbol, last_date=None, prefetched=None):
+    if prefetched is None and skip_unfetchable(i, total, coin_id, symbol):
+        return None
+    log(f"[{i + 1}/{total}] {symbol} ({coin_id})")
+
+    # --- FILTER 2: Get last date available (skipped when already known)
+    if prefetched is None:
+        last_date = filter2_get_last_date(coin_id)
+
+    # --- FILTER 3: Download only missing data
+    success = filter3_download_missing(coin_id, symbol, last_date, prefetched)
+    if not success:
+        log(f"Failed to update {symbol}")
+    return success
+
+
+def run_serial(coins):
+    results = {}
     for i, row in coins.iterrows():
         coin_id = row["id"]
         symbol = row["symbol"].upper()
-        log(f"[{i + 1}/{len(coins)}] {symbol} ({coin_id})")
+        results[coin_id] = process_coin(i, len(coins), coin_id, symbol)
+        time.sleep(SLEEP_SHORT)
+    return results
 
-        # --- FILTER 2: Get last date available
-        last_date = filter2_get_last_date(coin_id)
 
-        # --- FILTER 3: Download only missing data
-        success = filter3_download_missing(coin_id, symbol, last_date)
-        if not success:
-            log(f"Failed to update {symbol}")
-        time.sleep(SLEEP_SHORT)
+def run_concurrent(coins, workers):
+    """
+    Process coins on a bounded thread pool. Each source is throttled by its own
+    token bucket, so Yahoo, Binance and CoinGecko calls overlap without exceeding limits.
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(process_coin, i, len(coins), row["id"], row["symbol"].upper()): row["id"]
+            for i, row in coins.iterrows()
+        }
+        for future in as_completed(futures):
+            coin_id = futures[future]
+            try:
+                results[coin_id] = future.result()
+            except Exception as e:
+                log(f"Unexpected error for {coin_id}: {e}")
+                results[coin_id] = False
+    return results
+
+
+def repair_coin(i, total, coin_id, symbol):
+    log(f"[{i + 1}/{total}] {symbol} ({coin_id}) gap repair")
+    ok = filter3_repair_gaps(coin_id, symbol)
+    # repaired days can fall into any week / month, not only the newest one
+    refresh_rollups(coin_id, full=True)
+    return ok
+
+
+def run_gap_repair(coins, workers):
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = {
+            pool.submit(repair_coin, i, len(coins), row["id"], row["symbol"].upper()): row["id"]
+            for i, row in coins.iterrows()
+        }
+        for future in as_completed(futures):
+            coin_id = futures[future]
+            try:
+                results[coin_id] = future.result()
+            except Exception as e:
+                log(f"Unexpected error repairing {coin_id}: {e}")
+                results[coin_id] = False
+    return results
+
+
+def update_coin_hourly(i, total, coin_id, symbol):
+    """
+    Fetch the closed hours since the coin's last stored hour and roll them up.
+    Returns True / False for updated / failed, None when Binance has no hourly data for the coin.
+    """
+    last = hourly_store.last_hour(coin_id)
+    if last is not None:
+        since = last + timedelta(hours=1)
+    else:
+        this_hour = datetime.now(timezone.utc).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+        since = this_hour - timedelta(days=HOURLY_BACKFILL_DAYS)
+
+    df = fetch_binance_hourly(symbol, since)
+    if df is None or df.empty:
+        if last is None:
+            log(f"[{i + 1}/{total}] {symbol} ({coin_id}) not on Binance, no hourly data")
+            return None
+        log(f"[{i + 1}/{total}] {symbol} ({coin_id}) no new hours since {last:%Y-%m-%d %H:00}")
+        return True
+
+    added = hourly_store.append_hourly(coin_id, df)
+    counts = rollups.update_coin(coin_id)
+    log(f"[{i + 1}/{total}] {symbol} ({coin_id}) +{len(added)} hours, rollups: "
+        + ", ".join(f"{n} {interval}" for interval, n in counts.items()))
+    return True
+
+
+def run_hourly(coins, workers):
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = {
+            pool.submit(update_coin_hourly, i, len(coins), row["id"], row["symbol"].upper()): row["id"]
+            for i, row in coins.iterrows()
+        }
+        for future in as_completed(futures):
+            coin_id = futures[future]
+            try:
+                results[coin_id] = future.result()
+            except Exception as e:
+                log(f"Unexpected error for {coin_id} (hourly): {e}")
+                results[coin_id] = False
+    return results
+
+
+def run_yahoo_batched(coins, workers):
+    """
+    Run Filter 2 for every coin, group coins sharing the same watermark and fetch
+    each group from Yahoo in multi-ticker batches. Coins Yahoo has no data for
+    fall through to Binance / CoinGecko as usual.
+    """
+    total = len(coins)
+    results = {}
+    jobs = []
+    for i, row in coins.iterrows():
+        coin_id = row["id"]
+        symbol = row["symbol"].upper()
+        if skip_unfetchable(i, total, coin_id, symbol):
+            results[coin_id] = None
+            if JOURNAL is not None:
+                JOURNAL.record(coin_id, None)
+            continue
+        jobs.append((i, coin_id, symbol, filter2_get_last_date(coin_id)))
+
+    groups = {}
+    for job in jobs:
+        groups.setdefault(filter3_since(job[3]), []).append(job)
+
+    yahoo_results = {}
+    for since, group in groups.items():
+        symbols = sorted({symbol for _, _, symbol, _ in group})
+        for start in range(0, len(symbols), YAHOO_BATCH_SIZE):
+            batch = symbols[start:start + YAHOO_BATCH_SIZE]
+            log(f"Yahoo batch: {len(batch)} symbols since {since or 'start'}")
+            for symbol, df in fetch_yahoo_batch(batch, since).items():
+                yahoo_results[(symbol, since)] = df
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        futures = {
+            pool.submit(process_coin, i, total, coin_id, symbol, last_date,
+                        {"yahoo": yahoo_results.get((symbol, filter3_since(last_date)))}): coin_id
+            for i, coin_id, symbol, last_date in jobs
+        }
+        for future in as_completed(futures):
+            coin_id = futures[future]
+            try:
+                results[coin_id] = future.result()
+            except Exception as e:
+                log(f"Unexpected error for {coin_id}: {e}")
+                results[coin_id] = False
+    return results
+
+
+def write_metrics(results):
+    METRICS.finish(results)
+    for line in METRICS.summary_lines():
+        log(line)
+    report_path = METRICS.write()
+    log(f"Run report: {report_path}, Prometheus metrics: {ingest_metrics.PROM_PATH}")
+
+
+def main():
+    global HEDGE_AFTER, RECHECK, JOURNAL, METRICS
+    parser = argparse.ArgumentParser(description="Filter 2 + Filter 3: update historical OHLCV data")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help="number of coins processed concurrently (1 = serial loop)")
+    parser.add_argument("--yahoo-batch", action="store_true",
+                        help="fetch Yahoo history in multi-ticker batches grouped by watermark")
+    parser.add_argument("--backend", choices=["csv", "parquet"], default=history_store.STORAGE_BACKEND,
+                        help="history storage backend (default: $HIST_BACKEND or csv)")
+    parser.add_argument("--hedge-after", type=float, default=HEDGE_AFTER,
+                        help="seconds before the next-best source is fired in parallel (default: off)")
+    parser.add_argument("--recheck", action="store_true",
+                        help="also check coins the negative cache would skip")
+    parser.add_argument("--only-failed", action="store_true",
+                        help="only rerun coins that failed in the last journaled run")
+    parser.add_argument("--fresh", action="store_true",
+                        help="start from the first coin even if the last run did not finish")
+    parser.add_argument("--repair-gaps", action="store_true",
+                        help="fetch only the missing date ranges inside existing histories")
+    parser.add_argument("--hourly", action="store_true",
+                        help="fetch closed 1h candles from Binance and update the day / week / month rollups")
+    args = parser.parse_args()
+    history_store.STORAGE_BACKEND = args.backend
+    HEDGE_AFTER = args.hedge_after
+    if HEDGE_AFTER:
+        set_hedge_workers(args.workers)
+    RECHECK = args.recheck
+
+    start_time = datetime.now()
+    coins = pd.read_csv(COINS_CSV, dtype=str)
+
+    if args.hourly:
+        METRICS = ingest_metrics.RunMetrics("hourly")
+        results = run_hourly(coins, args.workers)
+        updated = sum(1 for ok in results.values() if ok)
+        log(f"=== HOURLY DONE === {updated} coins updated, "
+            f"{sum(1 for ok in results.values() if ok is None)} without hourly data, "
+            f"elapsed {datetime.now() - start_time}")
+        write_metrics(results)
+        return
+
+    if args.repair_gaps:
+        METRICS = ingest_metrics.RunMetrics("gap-repair")
+        results = run_gap_repair(coins, args.workers)
+        unrepaired = sum(1 for ok in results.values() if not ok)
+        log(f"=== GAP REPAIR DONE === {len(results)} coins, {unrepaired} with unfilled gaps, "
+            f"elapsed {datetime.now() - start_time}")
+        log(http_client.summary())
+        write_metrics(results)
+        return
+
+    last_run_id, last_run = run_journal.last_run()
+    if args.only_failed:
+        failed_ids = {c for c, outcome in (last_run or {"coins": {}})["coins"].items() if outcome == "failed"}
+        coins = coins[coins["id"].isin(failed_ids)]
+        JOURNAL = run_journal.RunJournal()
+        JOURNAL.start(coins["id"], mode="only_failed")
+        log(f"Rerunning {len(coins)} coins that failed in run {last_run_id}")
+    elif last_run is not None and not last_run["done"] and not args.fresh:
+        # resume with the interrupted run's own coin list (e.g. an --only-failed subset), not all coins
+        if last_run["coin_ids"] is not None:
+            coins = coins[coins["id"].isin(last_run["coin_ids"])]
+        JOURNAL = run_journal.RunJournal(last_run_id)
+        JOURNAL.start(coins["id"], mode=last_run["mode"], resumed=True)
+        coins = coins[~coins["id"].isin(last_run["coins"])]
+        log(f"Resuming {last_run['mode']} run {last_run_id}: "
+            f"{len(last_run['coins'])} coins already done, {len(coins)} left")
+    else:
+        JOURNAL = run_journal.RunJournal()
+        JOURNAL.start(coins["id"])
+    coins = coins.reset_index(drop=True)
+    METRICS = ingest_metrics.RunMetrics(JOURNAL.run_id)
+
+    if args.yahoo_batch:
+        results = run_yahoo_batched(coins, args.workers)
+    elif args.workers <= 1:
+        results = run_serial(coins)
+    else:
+        results = run_concurrent(coins, args.workers)
+    JOURNAL.done()
 
     duration = datetime.now() - start_time
+    minutes = max(duration.total_seconds(), 1e-9) / 60
+    failed = sum(1 for ok in results.values() if ok is False)
+    skipped = sum(1 for ok in results.values() if ok is None)
     log(f"=== ALL DONE === Total elapsed time: {duration}")
+    log(f"Coins processed: {len(results)}, failed: {failed}, skipped (negative cache): {skipped}, "
+        f"throughput: {len(results) / minutes:.1f} coins/min")
+    log(http_client.summary())
+    write_metrics(results)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,445 @@
+import os
+import glob
+import time
+import shutil
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import manifest
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# =======================
+# CONFIG
+# =======================
+# "csv"     → historical/<coin_id>.csv + append-only historical/delta/<coin_id>.csv
+# "parquet" → historical_parquet/coin_id=<id>/year=<yyyy>/part-*.parquet (typed columns)
+STORAGE_BACKEND = os.environ.get("HIST_BACKEND", "csv")
+
+HIST_DIR = "historical"
+DELTA_DIR = os.path.join(HIST_DIR, "delta")
+PARQUET_DIR = "historical_parquet"
+COMPACT_WORKERS = 4
+
+OHLCV_COLUMNS = ["date", "open", "high", "low", "close", "volume"]
+# CSV column types: prices/volume stay float64 (the CSVs are rewritten on compaction,
+# so a float32 read would lose precision for good); dates are parsed by pandas below
+OHLCV_DTYPES = {"date": "string", "open": "float64", "high": "float64",
+                "low": "float64", "close": "float64", "volume": "float64"}
+
+
+def log(msg):
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{ts}] {msg}")
+
+
+def base_path(coin_id):
+    return os.path.join(HIST_DIR, f"{coin_id}.csv")
+
+
+def delta_path(coin_id):
+    return os.path.join(DELTA_DIR, f"{coin_id}.csv")
+
+
+def compacting_path(coin_id):
+    return delta_path(coin_id) + ".compacting"
+
+
+def coin_dir(coin_id):
+    return os.path.join(PARQUET_DIR, f"coin_id={coin_id}")
+
+
+def _parquet_schema():
+    return pa.schema([
+        ("date", pa.date32()),
+        ("open", pa.float64()),
+        ("high", pa.float64()),
+        ("low", pa.float64()),
+        ("close", pa.float64()),
+        ("volume", pa.float64()),
+    ])
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("The parquet history backend requires pyarrow (pip install pyarrow)")
+
+
+def _normalize(df):
+    df = df[OHLCV_COLUMNS].copy()
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    return df
+
+
+# =======================
+# WRITE PATH
+# =======================
+def _write_parquet_parts(root, df):
+    """Write one new part file per year partition under root (append-only)."""
+    schema = _parquet_schema()
+    stamp = time.time_ns()
+    years = pd.to_datetime(df["date"]).dt.year
+    for year, part in df.groupby(years):
+        year_dir = os.path.join(root, f"year={year}")
+        os.makedirs(year_dir, exist_ok=True)
+        table = pa.Table.from_pandas(part, schema=schema, preserve_index=False)
+        pq.write_table(table, os.path.join(year_dir, f"part-{stamp}.parquet"))
+
+
+def append_delta(coin_id, df_new):
+    """
+    Append new rows to the coin's delta file without touching the base CSV.
+    Cost is proportional to the new rows, not to the whole history.
+    """
+    os.makedirs(DELTA_DIR, exist_ok=True)
+    path = delta_path(coin_id)
+    df_new = df_new[OHLCV_COLUMNS]
+    df_new.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+    return path
+
+
+def save_history(coin_id, df, source=None):
+    """Replace the coin's full history and record it in the manifest."""
+    df = _normalize(df)
+    if STORAGE_BACKEND == "parquet":
+        _require_pyarrow()
+        _replace_parquet(coin_id, df)
+    else:
+        df.to_csv(base_path(coin_id), index=False)
+    manifest.update_entry(coin_id, df["date"].max(), len(df), source, history_checksum(coin_id))
+
+
+def append_history(coin_id, df_new, source=None):
+    """
+    Append-only write of new rows. Rows past the watermark only add their (distinct) dates
+    to the row count; if some are not (gap repair, overlapping fetches) the merged dates are
+    counted instead, since rows for dates already stored do not change the history.
+    The checksum is recomputed over the files now backing the coin.
+    """
+    df_new = _normalize(df_new)
+    # an entry that doesn't match the files (edited outside the tool) is recounted from storage
+    entry = manifest.get_entry(coin_id, history_checksum(coin_id)) or {}
+    if STORAGE_BACKEND == "parquet":
+        _require_pyarrow()
+        _write_parquet_parts(coin_dir(coin_id), df_new)
+    else:
+        append_delta(coin_id, df_new)
+
+    last = df_new["date"].max()
+    stored_last = entry.get("last_date")
+    if stored_last is not None and entry.get("row_count") is not None and df_new["date"].min() > stored_last:
+        row_count = entry["row_count"] + df_new["date"].nunique()
+    else:
+        row_count = len(read_history(coin_id, columns=["date"]))
+    if stored_last is not None:
+        last = max(last, stored_last)
+        if df_new["date"].min() <= stored_last:
+            # behind the DB watermark of load_ohlcv.py, which only picks these up through the mark
+            manifest.mark_dirty(coin_id, df_new["date"].min())
+    manifest.update_entry(coin_id, last, row_count, source, history_checksum(coin_id))
+
+
+def _replace_parquet(coin_id, df):
+    """Rewrite a coin's partitions in a temp dir and swap it in."""
+    target = coin_dir(coin_id)
+    tmp = target + ".tmp"
+    old = target + ".old"
+    shutil.rmtree(tmp, ignore_errors=True)
+    _write_parquet_parts(tmp, df)
+    if os.path.exists(target):
+        os.replace(target, old)
+    os.replace(tmp, target)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+# =======================
+# READ PATH (merged view)
+# =======================
+def _read_csv(path, columns=None):
+    """
+    Typed read of one CSV part: only `columns` (all if None), OHLCV columns with
+    fixed types instead of inferred ones, through pyarrow's parser when installed.
+    """
+    if pa is not None:
+        arrow_types = {"string": pa.string(), "float64": pa.float64()}
+        convert = pacsv.ConvertOptions(
+            column_types={col: arrow_types[kind] for col, kind in OHLCV_DTYPES.items()},
+            include_columns=columns or [],
+        )
+        df = pacsv.read_csv(path, convert_options=convert).to_pandas()
+    else:
+        dtype = {col: (str if kind == "string" else kind) for col, kind in OHLCV_DTYPES.items()}
+        df = pd.read_csv(path, usecols=columns, dtype=dtype)
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    return df
+
+
+def _parquet_files(coin_id):
+    # year=YYYY/part-<time_ns>[-c] → sorted paths are ordered by year, then by write time
+    # (a compacted part, "-c", sorts right before the oldest part it replaced)
+    return sorted(glob.glob(os.path.join(coin_dir(coin_id), "year=*", "*.parquet")))
+
+
+def _read_parquet(coin_id, columns=None, since=None):
+    files = _parquet_files(coin_id)
+    if not files:
+        return None
+    if since is not None:
+        files = [f for f in files if int(os.path.basename(os.path.dirname(f))[len("year="):]) >= since.year]
+        if not files:
+            return pd.DataFrame(columns=columns or OHLCV_COLUMNS)
+    dataset = ds.dataset(files, schema=_parquet_schema(), format="parquet")
+    row_filter = ds.field("date") >= since if since is not None else None
+    return dataset.to_table(columns=columns, filter=row_filter).to_pandas()
+
+
+def _read_csv_history(coin_id, columns=None, since=None):
+    parts = [
+        _read_csv(path, columns)
+        for path in (base_path(coin_id), compacting_path(coin_id), delta_path(coin_id))
+        if os.path.exists(path)
+    ]
+    if not parts:
+        return None
+    combined = parts[0]
+    if len(parts) > 1:
+        combined = pd.concat(parts, ignore_index=True)
+        combined = combined.drop_duplicates(subset="date").sort_values("date").reset_index(drop=True)
+    if since is not None:
+        combined = combined[combined["date"] >= since]
+    return combined
+
+
+def read_history(coin_id, columns=None, since=None):
+    """
+    Merged view of a coin, deduplicated by date (existing rows win, as in the old
+    read-concat-rewrite path) and sorted. columns / since prune what is read;
+    the parquet backend skips whole year partitions and row groups before since.
+    Returns None if the coin has no history at all.
+    """
+    if columns is not None and "date" not in columns:
+        columns = ["date"] + list(columns)
+
+    if STORAGE_BACKEND != "parquet":
+        return _read_csv_history(coin_id, columns, since)
+
+    _require_pyarrow()
+    df = _read_parquet(coin_id, columns, since)
+    if df is None:
+        return None
+    return df.drop_duplicates(subset="date").sort_values("date").reset_index(drop=True)
+
+
+def source_files(coin_id):
+    """Files that currently back a coin's history in the selected backend."""
+    if STORAGE_BACKEND == "parquet":
+        return _parquet_files(coin_id)
+    paths = (base_path(coin_id), compacting_path(coin_id), delta_path(coin_id))
+    return [path for path in paths if os.path.exists(path)]
+
+
+def find_gaps(dates):
+    """
+    Missing calendar days inside a date column, as [(first_missing, last_missing), ...].
+    Vectorized: one np.diff over the sorted unique days.
+    """
+    days = pd.to_datetime(pd.Series(dates), errors="coerce").dropna()
+    if days.empty:
+        return []
+    days = np.unique(days.values.astype("datetime64[D]"))
+    step = np.diff(days).astype(np.int64)
+    idx = np.nonzero(step > 1)[0]
+    one = np.timedelta64(1, "D")
+    starts = (days[idx] + one).astype(object)
+    ends = (days[idx + 1] - one).astype(object)
+    return list(zip(starts, ends))
+
+
+def has_history(coin_id):
+    if STORAGE_BACKEND == "parquet":
+        return bool(_parquet_files(coin_id))
+    return os.path.exists(base_path(coin_id))
+
+
+def last_date(coin_id):
+    """max(date) from storage; the parquet backend only reads the date column of the newest year."""
+    if STORAGE_BACKEND == "parquet":
+        _require_pyarrow()
+        files = _parquet_files(coin_id)
+        if not files:
+            return None
+        newest = os.path.dirname(files[-1])
+        newest_files = [f for f in files if os.path.dirname(f) == newest]
+        dates = ds.dataset(newest_files, schema=_parquet_schema(), format="parquet").to_table(columns=["date"])
+        return dates.column("date").to_pandas().max() if dates.num_rows else None
+    df = read_history(coin_id, columns=["date"])
+    return None if df is None or df.empty else df["date"].max()
+
+
+def history_checksum(coin_id):
+    """
+    Checksum (size + mtime, see manifest.file_checksum) of everything backing the coin:
+    the base CSV alone once compacted, otherwise an MD5 over the checksums of the
+    base + delta files / all parquet parts.
+    """
+    files = source_files(coin_id)
+    if not files:
+        return None
+    if STORAGE_BACKEND != "parquet" and len(files) == 1:
+        return manifest.file_checksum(files[0])
+    h = hashlib.md5()
+    for path in files:
+        h.update(manifest.file_checksum(path).encode())
+    return h.hexdigest()
+
+
+def list_coins():
+    if STORAGE_BACKEND == "parquet":
+        if not os.path.isdir(PARQUET_DIR):
+            return []
+        return sorted(d[len("coin_id="):] for d in os.listdir(PARQUET_DIR)
+                      if d.startswith("coin_id=") and not d.endswith((".tmp", ".old")))
+    coins = {f[:-len(".csv")] for f in os.listdir(HIST_DIR) if f.endswith(".csv")}
+    if os.path.isdir(DELTA_DIR):
+        coins |= {f[:-len(".csv")] for f in os.listdir(DELTA_DIR) if f.endswith(".csv")}
+    return sorted(coins)
+
+
+def has_pending_delta(coin_id):
+    if STORAGE_BACKEND == "parquet":
+        partitions = [os.path.dirname(f) for f in _parquet_files(coin_id)]
+        return len(partitions) != len(set(partitions))
+    return os.path.exists(delta_path(coin_id)) or os.path.exists(compacting_path(coin_id))
+
+
+# =======================
+# COMPACTION
+# =======================
+def _compact_parquet(coin_id):
+    """
+    Merge the coin's parts into one per year, in place. Only the parts listed before the
+    read are merged and then deleted, so parts appended while compaction runs are kept.
+    A merged part takes the place of the oldest part it replaces in read order, so its
+    rows still win over later appends.
+    """
+    if not has_pending_delta(coin_id):
+        return False
+    snapshot = _parquet_files(coin_id)
+    merged = ds.dataset(snapshot, schema=_parquet_schema(), format="parquet").to_table().to_pandas()
+    merged = merged.drop_duplicates(subset="date").sort_values("date")
+
+    oldest = {}
+    for path in snapshot:
+        oldest.setdefault(os.path.dirname(path), path)
+    schema = _parquet_schema()
+    written = set()
+    for year, part in merged.groupby(pd.to_datetime(merged["date"]).dt.year):
+        year_dir = os.path.join(coin_dir(coin_id), f"year={year}")
+        stamp = os.path.basename(oldest[year_dir]).split("-")[1].split(".")[0]
+        target = os.path.join(year_dir, f"part-{stamp}-c.parquet")
+        tmp = target + ".tmp"
+        pq.write_table(pa.Table.from_pandas(part, schema=schema, preserve_index=False), tmp)
+        os.replace(tmp, target)
+        written.add(target)
+    for path in snapshot:
+        if path not in written:
+            os.remove(path)
+
+    df = read_history(coin_id, columns=["date"])
+    manifest.update_entry(coin_id, df["date"].max(), len(df), checksum=history_checksum(coin_id))
+    log(f"Compacted {coin_id} ({len(merged)} rows)")
+    return True
+
+
+def compact(coin_id):
+    """
+    Fold the coin's delta into its base CSV. The delta is renamed first, so rows
+    appended while compaction runs land in a fresh delta file and are not lost.
+    The base is replaced atomically.
+    """
+    if STORAGE_BACKEND == "parquet":
+        return _compact_parquet(coin_id)
+
+    delta = delta_path(coin_id)
+    pending = compacting_path(coin_id)
+    if os.path.exists(delta) and not os.path.exists(pending):
+        os.replace(delta, pending)
+    if not os.path.exists(pending):
+        return False
+
+    parts = [_read_csv(p) for p in (base_path(coin_id), pending) if os.path.exists(p)]
+    merged = pd.concat(parts, ignore_index=True)
+    merged = merged.drop_duplicates(subset="date").sort_values("date")
+
+    tmp = base_path(coin_id) + ".tmp"
+    merged.to_csv(tmp, index=False)
+    os.replace(tmp, base_path(coin_id))
+    os.remove(pending)
+
+    manifest.update_entry(coin_id, merged["date"].max(), len(merged), checksum=history_checksum(coin_id))
+    log(f"Compacted {coin_id} ({len(merged)} rows)")
+    return True
+
+
+def compact_all(workers=COMPACT_WORKERS):
+    if STORAGE_BACKEND == "parquet":
+        coins = list_coins()
+    elif os.path.isdir(DELTA_DIR):
+        coins = sorted({
+            f.split(".csv")[0] for f in os.listdir(DELTA_DIR)
+            if f.endswith(".csv") or f.endswith(".csv.compacting")
+        })
+    else:
+        return 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        done = sum(pool.map(compact, coins))
+    return done
+
+
+def migrate_csv_to_parquet():
+    """One-off conversion of historical/*.csv (+ deltas) into the parquet dataset."""
+    _require_pyarrow()
+    coins = {f[:-len(".csv")] for f in os.listdir(HIST_DIR) if f.endswith(".csv")}
+    if os.path.isdir(DELTA_DIR):
+        coins |= {f[:-len(".csv")] for f in os.listdir(DELTA_DIR) if f.endswith(".csv")}
+    migrated = 0
+    for coin_id in sorted(coins):
+        df = _read_csv_history(coin_id)
+        if df is None or df.empty:
+            continue
+        _replace_parquet(coin_id, _normalize(df))
+        migrated += 1
+    log(f"Migrated {migrated} coins to {PARQUET_DIR}")
+
+
+def main():
+    global STORAGE_BACKEND
+    parser = argparse.ArgumentParser(description="Maintain the historical OHLCV store")
+    parser.add_argument("--workers", type=int, default=COMPACT_WORKERS)
+    parser.add_argument("--backend", choices=["csv", "parquet"], default=STORAGE_BACKEND)
+    parser.add_argument("--migrate-to-parquet", action="store_true",
+                        help="convert historical/*.csv into the partitioned parquet dataset")
+    args = parser.parse_args()
+    STORAGE_BACKEND = args.backend
+
+    if args.migrate_to_parquet:
+        migrate_csv_to_parquet()
+        return
+
+    start = datetime.now()
+    done = compact_all(args.workers)
+    log(f"Compaction done: {done} coins in {datetime.now() - start}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+import pandas as pd
+
+# =======================
+# CONFIG
+# =======================
+# historical_hourly/<coin_id>.csv, append-only; one row per closed 1h candle,
+# "datetime" is the candle's open time in UTC (naive), "volume" is the quote (USDT) volume
+HOURLY_DIR = "historical_hourly"
+
+HOURLY_COLUMNS = ["datetime", "open", "high", "low", "close", "volume"]
+
+
+def hourly_path(coin_id):
+    return os.path.join(HOURLY_DIR, f"{coin_id}.csv")
+
+
+def has_hourly(coin_id):
+    return os.path.exists(hourly_path(coin_id))
+
+
+def read_hourly(coin_id, since=None):
+    """Stored hours of a coin (deduplicated, sorted), from `since` (a datetime) on; None if there are none."""
+    path = hourly_path(coin_id)
+    if not os.path.exists(path):
+        return None
+    df = pd.read_csv(path, dtype={c: "float64" for c in HOURLY_COLUMNS[1:]})
+    df["datetime"] = pd.to_datetime(df["datetime"])
+    if since is not None:
+        df = df[df["datetime"] >= since]
+    return df.drop_duplicates(subset="datetime").sort_values("datetime").reset_index(drop=True)
+
+
+def last_hour(coin_id):
+    path = hourly_path(coin_id)
+    if not os.path.exists(path):
+        return None
+    hours = pd.read_csv(path, usecols=["datetime"])["datetime"]
+    return pd.to_datetime(hours).max() if len(hours) else None
+
+
+def append_hourly(coin_id, df_new):
+    """Append closed candles newer than the stored ones; returns the appended rows."""
+    last = last_hour(coin_id)
+    df_new = df_new[HOURLY_COLUMNS]
+    if last is not None:
+        df_new = df_new[df_new["datetime"] > last]
+    if df_new.empty:
+        return df_new
+    os.makedirs(HOURLY_DIR, exist_ok=True)
+    path = hourly_path(coin_id)
+    df_new.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+    return df_new
+
+
+def list_coins():
+    if not os.path.isdir(HOURLY_DIR):
+        return []
+    return sorted(f[:-len(".csv")] for f in os.listdir(HOURLY_DIR) if f.endswith(".csv"))
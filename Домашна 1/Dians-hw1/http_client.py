@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import requests
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from requests.adapters import HTTPAdapter
+
+# =======================
+# CONFIG
+# =======================
+CACHE_DIR = "http_cache"
+POOL_SIZE = 16
+MAX_RETRIES = 5
+BACKOFF_BASE = 2.0  # seconds, doubled on every retry without a Retry-After header
+BACKOFF_MAX = 120.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+stats = {
+    "requests": 0,
+    "cache_hits": 0,
+    "cache_misses": 0,
+    "retries": 0,
+    "backoff_seconds": 0.0,
+}
+
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response served from the on-disk cache."""
+
+    def __init__(self, status_code, content, headers):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.from_cache = True
+        self.retries = 0
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def _count(key, amount=1):
+    with _stats_lock:
+        stats[key] += amount
+
+
+def get_session():
+    """One pooled session per process, shared by every ingestion script and thread."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+# =======================
+# CACHE
+# =======================
+def _cache_path(url, params):
+    key = json.dumps([url, sorted((params or {}).items())], default=str)
+    return os.path.join(CACHE_DIR, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+
+def _cache_read(url, params, ttl):
+    path = _cache_path(url, params)
+    if not os.path.exists(path) or time.time() - os.path.getmtime(path) > ttl:
+        return None
+    try:
+        with open(path) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return CachedResponse(entry["status_code"], entry["body"].encode("utf-8"), entry["headers"])
+
+
+def _cache_write(url, params, response):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _cache_path(url, params)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({
+            "url": url,
+            "status_code": response.status_code,
+            "headers": dict(response.headers),
+            "body": response.text,
+        }, f)
+    os.replace(tmp, path)
+
+
+# =======================
+# BACKOFF
+# =======================
+def retry_after_seconds(response):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date), or None."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def backoff_delay(response, attempt):
+    """Retry-After of the response if it has one, else exponential backoff (response=None: no answer)."""
+    delay = retry_after_seconds(response) if response is not None else None
+    if delay is None:
+        delay = BACKOFF_BASE * (2 ** attempt)
+    return min(delay, BACKOFF_MAX)
+
+
+# =======================
+# PUBLIC API
+# =======================
+def get(url, params=None, timeout=30, cache_ttl=None, max_retries=MAX_RETRIES, log=print, acquire=None):
+    """
+    GET through the pooled session.
+    cache_ttl = None → no caching; cache_ttl = seconds → serve 200 responses from disk while fresh.
+    On 429/5xx waits for Retry-After (or exponential backoff) and retries up to max_retries times;
+    connection errors and timeouts are retried the same way and re-raised after the last attempt.
+    acquire, if given, is called before every attempt (e.g. the caller's TokenBucket.acquire),
+    so retries count against the caller's rate limit too.
+    Returns the last response (status may still be an error after retries);
+    response.retries is the number of retries it took.
+    """
+    if cache_ttl:
+        cached = _cache_read(url, params, cache_ttl)
+        if cached is not None:
+            _count("cache_hits")
+            return cached
+        _count("cache_misses")
+
+    session = get_session()
+    response = None
+    attempt = 0
+    for attempt in range(max_retries + 1):
+        if acquire is not None:
+            acquire()
+        _count("requests")
+        try:
+            response = session.get(url, params=params, timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == max_retries:
+                raise
+            delay = backoff_delay(None, attempt)
+            log(f"{type(e).__name__} from {url}, backing off {delay:.1f}s (attempt {attempt + 1})")
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+                break
+            delay = backoff_delay(response, attempt)
+            log(f"HTTP {response.status_code} from {url}, backing off {delay:.1f}s (attempt {attempt + 1})")
+        _count("retries")
+        _count("backoff_seconds", delay)
+        time.sleep(delay)
+    response.retries = attempt
+
+    if cache_ttl and response.status_code == 200:
+        _cache_write(url, params, response)
+    return response
+
+
+def summary():
+    with _stats_lock:
+        s = dict(stats)
+    return (f"HTTP requests: {s['requests']}, cache hits: {s['cache_hits']}, "
+            f"cache misses: {s['cache_misses']}, retries: {s['retries']}, "
+            f"backoff: {s['backoff_seconds']:.1f}s")
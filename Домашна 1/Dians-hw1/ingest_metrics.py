@@ -0,0 +1,226 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime
+
+from run_journal import OUTCOMES
+
+# =======================
+# CONFIG
+# =======================
+# One JSON report per run (named by start time and run id) and a Prometheus text file that is
+# overwritten on every run (node_exporter textfile collector format)
+REPORT_DIR = "ingest_reports"
+PROM_PATH = "ingest_metrics.prom"
+# Upper bounds (seconds) of the provider latency histogram buckets
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+_current = threading.local()
+
+
+# =======================
+# PER-CALL NOTES
+# =======================
+def note(**fields):
+    """Attach fields (status, retries, ...) to the provider call running on this thread, if any."""
+    call = getattr(_current, "call", None)
+    if call is not None:
+        call.update(fields)
+
+
+def note_wait(seconds):
+    """Rate-limit wait inside the current call; it is reported separately, not as latency."""
+    call = getattr(_current, "call", None)
+    if call is not None:
+        call["wait"] = call.get("wait", 0.0) + seconds
+
+
+def count_rows(result):
+    """Rows in a fetch result: a DataFrame, a {symbol: DataFrame} batch, or None."""
+    if result is None:
+        return 0
+    if isinstance(result, dict):
+        return sum(count_rows(df) for df in result.values())
+    return len(result)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class _Call:
+    def __init__(self, metrics, source):
+        self.metrics = metrics
+        self.source = source
+        self.fields = {}
+        self.result = None
+
+    def __enter__(self):
+        self.outer = getattr(_current, "call", None)
+        _current.call = self.fields
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.monotonic() - self.start
+        _current.call = self.outer
+        rows = count_rows(self.result)
+        status = self.fields.get("status") or ("error" if exc_type else "ok" if rows else "empty")
+        wait = self.fields.get("wait", 0.0)
+        self.metrics.record_call(self.source, max(elapsed - wait, 0.0), status, rows,
+                                 self.fields.get("retries", 0), wait)
+        return False
+
+
+# =======================
+# RUN METRICS
+# =======================
+class RunMetrics:
+    """
+    Collects every provider call of a Filter 2/3 run (latency, status, rows, retries,
+    rate-limit wait) and the per-coin outcomes, then renders them as a JSON report
+    and as Prometheus text.
+    """
+
+    def __init__(self, run_id=None):
+        self.run_id = run_id
+        self.lock = threading.Lock()
+        self.started_at = datetime.now()
+        self.start = time.monotonic()
+        self.elapsed = None
+        self.sources = {}
+        self.coins = {outcome: 0 for outcome in OUTCOMES.values()}
+
+    def call(self, source):
+        """with metrics.call("yahoo") as c: c.result = fetch(...)"""
+        return _Call(self, source)
+
+    def record_call(self, source, seconds, status, rows=0, retries=0, wait=0.0):
+        with self.lock:
+            s = self.sources.setdefault(source, {
+                "calls": 0, "statuses": {}, "rows": 0, "retries": 0,
+                "wait_seconds": 0.0, "latencies": [],
+            })
+            s["calls"] += 1
+            s["statuses"][status] = s["statuses"].get(status, 0) + 1
+            s["rows"] += rows
+            s["retries"] += retries
+            s["wait_seconds"] += wait
+            s["latencies"].append(seconds)
+
+    def finish(self, results):
+        """results = {coin_id: True / False / None} as returned by the run_* schedulers."""
+        with self.lock:
+            self.elapsed = time.monotonic() - self.start
+            for result in results.values():
+                self.coins[OUTCOMES[result]] += 1
+
+    # =======================
+    # REPORTS
+    # =======================
+    def _histogram(self, latencies):
+        return {str(le): sum(1 for x in latencies if x <= le) for le in LATENCY_BUCKETS}
+
+    def report(self):
+        with self.lock:
+            elapsed = self.elapsed if self.elapsed is not None else time.monotonic() - self.start
+            total_coins = sum(self.coins.values())
+            sources = {}
+            for source, s in sorted(self.sources.items()):
+                lat = s["latencies"]
+                sources[source] = {
+                    "calls": s["calls"],
+                    "statuses": dict(s["statuses"]),
+                    "rows": s["rows"],
+                    "retries": s["retries"],
+                    "wait_seconds": round(s["wait_seconds"], 3),
+                    "latency_seconds": {
+                        "sum": round(sum(lat), 3),
+                        "p50": percentile(lat, 0.50),
+                        "p95": percentile(lat, 0.95),
+                        "max": max(lat) if lat else None,
+                        "buckets": self._histogram(lat),
+                    },
+                }
+            return {
+                "run_id": self.run_id,
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "elapsed_seconds": round(elapsed, 3),
+                "coins": dict(self.coins),
+                "coins_per_second": round(total_coins / max(elapsed, 1e-9), 4),
+                "sources": sources,
+            }
+
+    def prometheus(self):
+        r = self.report()
+        lines = [
+            "# HELP ingest_provider_call_seconds Provider call latency, rate-limit wait excluded.",
+            "# TYPE ingest_provider_call_seconds histogram",
+        ]
+        for source, s in r["sources"].items():
+            lat = s["latency_seconds"]
+            for le, count in lat["buckets"].items():
+                lines.append(f'ingest_provider_call_seconds_bucket{{source="{source}",le="{le}"}} {count}')
+            lines.append(f'ingest_provider_call_seconds_bucket{{source="{source}",le="+Inf"}} {s["calls"]}')
+            lines.append(f'ingest_provider_call_seconds_sum{{source="{source}"}} {lat["sum"]}')
+            lines.append(f'ingest_provider_call_seconds_count{{source="{source}"}} {s["calls"]}')
+
+        def counter(name, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            lines.extend(f"{name}{{{labels}}} {value}" for labels, value in samples)
+
+        counter("ingest_provider_calls_total", "Provider calls by status.",
+                [(f'source="{source}",status="{status}"', n)
+                 for source, s in r["sources"].items() for status, n in sorted(s["statuses"].items())])
+        counter("ingest_provider_rows_total", "Rows returned by providers.",
+                [(f'source="{source}"', s["rows"]) for source, s in r["sources"].items()])
+        counter("ingest_provider_retries_total", "HTTP retries inside provider calls.",
+                [(f'source="{source}"', s["retries"]) for source, s in r["sources"].items()])
+        counter("ingest_rate_limit_wait_seconds_total", "Seconds spent waiting for a rate-limit token.",
+                [(f'source="{source}"', s["wait_seconds"]) for source, s in r["sources"].items()])
+        counter("ingest_coins_total", "Coins by outcome.",
+                [(f'outcome="{outcome}"', n) for outcome, n in r["coins"].items()])
+
+        lines += [
+            "# HELP ingest_run_duration_seconds Wall time of the run.",
+            "# TYPE ingest_run_duration_seconds gauge",
+            f"ingest_run_duration_seconds {r['elapsed_seconds']}",
+            "# HELP ingest_coins_per_second Coins finished per second.",
+            "# TYPE ingest_coins_per_second gauge",
+            f"ingest_coins_per_second {r['coins_per_second']}",
+            "# HELP ingest_run_timestamp_seconds Unix time the run started.",
+            "# TYPE ingest_run_timestamp_seconds gauge",
+            f"ingest_run_timestamp_seconds {int(self.started_at.timestamp())}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, report_dir=REPORT_DIR, prom_path=PROM_PATH):
+        """Write the JSON report and the Prometheus file (both atomically); returns the report path."""
+        os.makedirs(report_dir, exist_ok=True)
+        # timestamp first: reports sort chronologically, and a resumed run gets a report per attempt
+        name = self.started_at.strftime("%Y%m%d-%H%M%S") + (f"_{self.run_id}" if self.run_id else "")
+        report_path = os.path.join(report_dir, f"{name}.json")
+        for path, text in ((report_path, json.dumps(self.report(), indent=2)), (prom_path, self.prometheus())):
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(text)
+            os.replace(tmp, path)
+        return report_path
+
+    def summary_lines(self):
+        r = self.report()
+        lines = []
+        for source, s in r["sources"].items():
+            lat = s["latency_seconds"]
+            p50 = f"{lat['p50']:.2f}s" if lat["p50"] is not None else "-"
+            p95 = f"{lat['p95']:.2f}s" if lat["p95"] is not None else "-"
+            statuses = ", ".join(f"{k}={v}" for k, v in sorted(s["statuses"].items()))
+            lines.append(f"{source}: {s['calls']} calls ({statuses}), {s['rows']} rows, "
+                         f"{s['retries']} retries, p50 {p50}, p95 {p95}, "
+                         f"rate-limit wait {s['wait_seconds']:.1f}s")
+        return lines
@@ -0,0 +1,238 @@
+import argparse
+import numpy as np
+import pandas as pd
+import mysql.connector
+from datetime import datetime, timedelta
+
+import manifest
+import history_store
+import rollups
+
+# =======================
+# CONFIG
+# =======================
+DB_HOST = "localhost"
+DB_USER = "root"
+DB_PASS = "Test123!"
+DB_NAME = "crypto_data"
+
+COINS_CSV = "top_1000_coins.csv"
+
+BATCH_SIZE = 1000  # rows per multi-row INSERT
+TXN_ROWS = 20000  # rows per transaction
+
+UPSERT_SQL = """
+INSERT INTO ohlcv_data (coin_id, symbol, date, open, high, low, close, volume)
+VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
+ON DUPLICATE KEY UPDATE
+    symbol = COALESCE(VALUES(symbol), symbol),
+    open = VALUES(open),
+    high = VALUES(high),
+    low = VALUES(low),
+    close = VALUES(close),
+    volume = VALUES(volume)
+"""
+
+# Pre-aggregated week / month bars (see rollups.py) that the web views read
+# instead of resampling ohlcv_data on every request
+ROLLUP_INTERVALS = ["week", "month"]
+
+CREATE_ROLLUP_SQL = """
+CREATE TABLE IF NOT EXISTS ohlcv_rollup (
+    coin_id VARCHAR(100) NOT NULL,
+    symbol VARCHAR(20),
+    bar_interval VARCHAR(10) NOT NULL,
+    date DATE NOT NULL,
+    open DOUBLE,
+    high DOUBLE,
+    low DOUBLE,
+    close DOUBLE,
+    volume DOUBLE,
+    bars INT,
+    hourly_days INT DEFAULT 0,
+    PRIMARY KEY (coin_id, bar_interval, date),
+    INDEX idx_symbol_interval_date (symbol, bar_interval, date)
+)
+"""
+
+ROLLUP_UPSERT_SQL = """
+INSERT INTO ohlcv_rollup (coin_id, symbol, bar_interval, date, open, high, low, close, volume, bars, hourly_days)
+VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+ON DUPLICATE KEY UPDATE
+    symbol = COALESCE(VALUES(symbol), symbol),
+    open = VALUES(open),
+    high = VALUES(high),
+    low = VALUES(low),
+    close = VALUES(close),
+    volume = VALUES(volume),
+    bars = VALUES(bars),
+    hourly_days = VALUES(hourly_days)
+"""
+
+
+def log(msg):
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{ts}] {msg}")
+
+
+def load_watermarks(cursor):
+    """Latest loaded date per coin; served from the (coin_id, date) primary key."""
+    cursor.execute("SELECT coin_id, MAX(date) FROM ohlcv_data GROUP BY coin_id")
+    return {coin_id: last for coin_id, last in cursor.fetchall()}
+
+
+def load_symbols():
+    coins = pd.read_csv(COINS_CSV, dtype=str, usecols=["id", "symbol"])
+    return dict(zip(coins["id"], coins["symbol"].str.upper()))
+
+
+def new_rows(coin_id, symbol, since):
+    """Rows of a coin from `since` on (None = all), as INSERT parameter tuples."""
+    df = history_store.read_history(coin_id, columns=history_store.OHLCV_COLUMNS, since=since)
+    if df is None or df.empty:
+        return []
+    df = df.replace({np.nan: None})
+    return [
+        (coin_id, symbol, r.date, r.open, r.high, r.low, r.close, r.volume)
+        for r in df.itertuples(index=False)
+    ]
+
+
+def write_batches(conn, cursor, sql, rows, pending):
+    """executemany in BATCH_SIZE chunks, committing every TXN_ROWS rows; returns the uncommitted count."""
+    for i in range(0, len(rows), BATCH_SIZE):
+        batch = rows[i:i + BATCH_SIZE]
+        cursor.executemany(sql, batch)
+        pending += len(batch)
+        if pending >= TXN_ROWS:
+            conn.commit()
+            pending = 0
+    return pending
+
+
+def connect():
+    return mysql.connector.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASS,
+        database=DB_NAME,
+        autocommit=False
+    )
+
+
+def load(full=False):
+    conn = connect()
+    cursor = conn.cursor()
+
+    watermarks = {} if full else load_watermarks(cursor)
+    symbols = load_symbols()
+    entries = manifest.all_entries()
+    # coins with repaired gaps below their watermark: those ranges are upserted again
+    dirty = manifest.dirty_coins()
+
+    start = datetime.now()
+    total_rows = 0
+    loaded_coins = 0
+    skipped = 0
+    pending = 0
+
+    for coin_id in history_store.list_coins():
+        watermark = watermarks.get(coin_id)
+        entry = entries.get(coin_id)
+        if entry and entry["checksum"] != history_store.history_checksum(coin_id):
+            entry = None  # files changed outside the tool: don't trust its last_date
+        since = watermark + timedelta(days=1) if watermark is not None else None
+        if coin_id in dirty and since is not None:
+            since = min(since, dirty[coin_id])
+        # manifest says there is nothing past the DB watermark → don't even open the file
+        elif watermark is not None and entry and entry["last_date"] is not None and entry["last_date"] <= watermark:
+            skipped += 1
+            continue
+
+        rows = new_rows(coin_id, symbols.get(coin_id), since)
+        if not rows:
+            skipped += 1
+            continue
+
+        pending = write_batches(conn, cursor, UPSERT_SQL, rows, pending)
+        total_rows += len(rows)
+        loaded_coins += 1
+        log(f"{coin_id}: {len(rows)} rows (since {since or 'start'})")
+
+    conn.commit()
+    cursor.close()
+    conn.close()
+    for coin_id, since in dirty.items():
+        manifest.clear_dirty(coin_id, since)
+
+    elapsed = max((datetime.now() - start).total_seconds(), 1e-9)
+    log(f"Loaded {total_rows} rows for {loaded_coins} coins, {skipped} coins up to date, "
+        f"{total_rows / elapsed:.0f} rows/sec")
+    return total_rows
+
+
+def load_rollup_watermarks(cursor):
+    """
+    First bar date per (coin, interval) that may have changed since the last load: the newest
+    bar (it may have been partial) or the oldest bar that still held days built from hourly data.
+    """
+    cursor.execute("""
+    SELECT coin_id, bar_interval, MAX(date), MIN(CASE WHEN hourly_days > 0 THEN date END)
+    FROM ohlcv_rollup GROUP BY coin_id, bar_interval
+    """)
+    return {(coin_id, interval): min(d for d in (newest, provisional) if d is not None)
+            for coin_id, interval, newest, provisional in cursor.fetchall()}
+
+
+def load_rollups(full=False):
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute(CREATE_ROLLUP_SQL)
+
+    watermarks = {} if full else load_rollup_watermarks(cursor)
+    symbols = load_symbols()
+
+    start = datetime.now()
+    total_rows = 0
+    pending = 0
+    for coin_id in rollups.list_coins():
+        for interval in ROLLUP_INTERVALS:
+            df = rollups.read_rollup(coin_id, interval, since=watermarks.get((coin_id, interval)))
+            if df is None or df.empty:
+                continue
+            if "hourly_days" not in df.columns:
+                df["hourly_days"] = 0
+            df = df.replace({np.nan: None})
+            rows = [
+                (coin_id, symbols.get(coin_id), interval, r.date, r.open, r.high, r.low, r.close,
+                 r.volume, int(r.bars), int(r.hourly_days or 0))  # numpy ints aren't accepted by the driver
+                for r in df.itertuples(index=False)
+            ]
+            pending = write_batches(conn, cursor, ROLLUP_UPSERT_SQL, rows, pending)
+            total_rows += len(rows)
+
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+    elapsed = max((datetime.now() - start).total_seconds(), 1e-9)
+    log(f"Loaded {total_rows} rollup bars, {total_rows / elapsed:.0f} rows/sec")
+    return total_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally load historical OHLCV into ohlcv_data")
+    parser.add_argument("--full", action="store_true", help="ignore DB watermarks and upsert every row")
+    parser.add_argument("--backend", choices=["csv", "parquet"], default=history_store.STORAGE_BACKEND)
+    parser.add_argument("--rollups", action="store_true",
+                        help="load the week / month bars from rollups/ into ohlcv_rollup instead")
+    args = parser.parse_args()
+    history_store.STORAGE_BACKEND = args.backend
+    if args.rollups:
+        load_rollups(args.full)
+    else:
+        load(args.full)
+
+
+if __name__ == "__main__":
+    main()
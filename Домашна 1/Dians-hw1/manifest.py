@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime, date
+
+# =======================
+# CONFIG
+# =======================
+# Sidecar index next to the historical/ directory:
+# coin_id → last date, row count, winning source and checksum of the history files' size + mtime,
+# plus the coins with rows written below their last date (gap repairs) that load_ohlcv.py still has to upsert
+MANIFEST_PATH = "historical_manifest.sqlite"
+
+_lock = threading.Lock()
+
+
+def _connect(path=MANIFEST_PATH):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS manifest (
+        coin_id TEXT PRIMARY KEY,
+        last_date TEXT,
+        row_count INTEGER,
+        source TEXT,
+        checksum TEXT,
+        updated_at TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS dirty (
+        coin_id TEXT PRIMARY KEY,
+        since TEXT
+    )
+    """)
+    return conn
+
+
+def file_checksum(path):
+    """Checksum of a file's name, size and mtime: one stat, so it can be checked on every read."""
+    st = os.stat(path)
+    return hashlib.md5(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns}".encode()).hexdigest()
+
+
+def _to_entry(coin_id, last_date, row_count, source, checksum):
+    return {
+        "coin_id": coin_id,
+        "last_date": date.fromisoformat(last_date) if last_date else None,
+        "row_count": row_count,
+        "source": source,
+        "checksum": checksum,
+    }
+
+
+def get_entry(coin_id, checksum=None, path=MANIFEST_PATH):
+    """
+    Return the manifest entry for a coin as a dict, or None if it is not indexed.
+    checksum = the history's current checksum: an entry recorded for other files (e.g. a
+    history edited outside the tool) is stale and also returned as None.
+    """
+    with _lock:
+        conn = _connect(path)
+        try:
+            row = conn.execute(
+                "SELECT last_date, row_count, source, checksum FROM manifest WHERE coin_id = ?",
+                (coin_id,)
+            ).fetchone()
+        finally:
+            conn.close()
+    if row is None or (checksum is not None and row[3] != checksum):
+        return None
+    return _to_entry(coin_id, *row)
+
+
+def update_entry(coin_id, last_date, row_count, source=None, checksum=None, path=MANIFEST_PATH):
+    """
+    Upsert a coin's entry in a single transaction. source=None keeps the previously
+    recorded source (e.g. when the entry is rebuilt from a CSV scan).
+    """
+    last_date = last_date.isoformat() if last_date is not None else None
+    with _lock:
+        conn = _connect(path)
+        try:
+            with conn:
+                conn.execute("""
+                INSERT INTO manifest (coin_id, last_date, row_count, source, checksum, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(coin_id) DO UPDATE SET
+                    last_date = excluded.last_date,
+                    row_count = excluded.row_count,
+                    source = COALESCE(excluded.source, manifest.source),
+                    checksum = excluded.checksum,
+                    updated_at = excluded.updated_at
+                """, (coin_id, last_date, row_count, source, checksum, datetime.now().isoformat()))
+        finally:
+            conn.close()
+
+
+def all_entries(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {}
+    with _lock:
+        conn = _connect(path)
+        try:
+            rows = conn.execute(
+                "SELECT coin_id, last_date, row_count, source, checksum FROM manifest"
+            ).fetchall()
+        finally:
+            conn.close()
+    return {row[0]: _to_entry(*row) for row in rows}
+
+
+def mark_dirty(coin_id, since, path=MANIFEST_PATH):
+    """Rows from `since` on changed below the coin's last date; keeps the earliest such date."""
+    with _lock:
+        conn = _connect(path)
+        try:
+            with conn:
+                conn.execute("""
+                INSERT INTO dirty (coin_id, since) VALUES (?, ?)
+                ON CONFLICT(coin_id) DO UPDATE SET since = MIN(dirty.since, excluded.since)
+                """, (coin_id, since.isoformat()))
+        finally:
+            conn.close()
+
+
+def dirty_coins(path=MANIFEST_PATH):
+    """{coin_id: earliest changed date} of the coins marked by mark_dirty."""
+    if not os.path.exists(path):
+        return {}
+    with _lock:
+        conn = _connect(path)
+        try:
+            rows = conn.execute("SELECT coin_id, since FROM dirty").fetchall()
+        finally:
+            conn.close()
+    return {coin_id: date.fromisoformat(since) for coin_id, since in rows}
+
+
+def clear_dirty(coin_id, since, path=MANIFEST_PATH):
+    """Drop the mark once rows from `since` on are loaded, unless an earlier date was marked meanwhile."""
+    with _lock:
+        conn = _connect(path)
+        try:
+            with conn:
+                conn.execute("DELETE FROM dirty WHERE coin_id = ? AND since >= ?", (coin_id, since.isoformat()))
+        finally:
+            conn.close()
@@ -1,25 +1,126 @@
 import os
-import pandas as pd
+import json
+import argparse
+
+import history_store
 
-HIST_DIR = "historical"
 OUTPUT = "all_coins.csv"
+# Byte offsets of each coin's section in OUTPUT + the source signature it was built from
+MERGE_STATE = "all_coins.merge_state.json"
+
+COPY_CHUNK = 1 << 20
+
 
-rows = []
+def source_signature(coin_id):
+    """(path, size, mtime) of every file backing a coin; changes whenever the coin is written."""
+    signature = []
+    for path in history_store.source_files(coin_id):
+        st = os.stat(path)
+        signature.append([path, st.st_size, st.st_mtime_ns])
+    return signature
 
-for filename in os.listdir(HIST_DIR):
-    if not filename.endswith(".csv"):
-        continue
 
-    coin_id = filename.replace(".csv", "")
-    path = os.path.join(HIST_DIR, filename)
+def load_state():
+    if not os.path.exists(MERGE_STATE) or not os.path.exists(OUTPUT):
+        return {}
+    with open(MERGE_STATE) as f:
+        state = json.load(f)
+    # OUTPUT was replaced or edited outside merge_all → offsets are stale, do a full merge
+    st = os.stat(OUTPUT)
+    if state.get("output") != [st.st_size, st.st_mtime_ns]:
+        return {}
+    return state
 
-    df = pd.read_csv(path)
+
+def render_coin(coin_id, write_header):
+    # merged view: base + pending append-only deltas / parquet parts
+    df = history_store.read_history(coin_id, columns=history_store.OHLCV_COLUMNS)
+    if df is None or df.empty:
+        return ""
     df["coin_id"] = coin_id
-    rows.append(df)
+    return df.to_csv(index=False, header=write_header, lineterminator="\n")
+
+
+def copy_section(src, out, offset, length):
+    src.seek(offset)
+    while length > 0:
+        chunk = src.read(min(COPY_CHUNK, length))
+        if not chunk:
+            break
+        out.write(chunk)
+        length -= len(chunk)
+
+
+def merge(incremental=False):
+    """
+    Stream coins in coin_id order into OUTPUT, holding one coin in memory at a time.
+    In incremental mode, sections of coins whose source files are unchanged since the
+    last merge are byte-copied from the previous OUTPUT instead of re-read and re-rendered.
+    """
+    state = load_state() if incremental else {}
+    old_sections = state.get("coins", {})
+    old_output = open(OUTPUT, "rb") if old_sections else None
+
+    tmp = OUTPUT + ".tmp"
+    sections = {}
+    total_rows = 0
+    rewritten = 0
+    header = state.get("header")
+
+    try:
+        with open(tmp, "wb") as out:
+            if header is not None and old_output is not None:
+                out.write(header.encode())
+
+            for coin_id in history_store.list_coins():
+                signature = source_signature(coin_id)
+                old = old_sections.get(coin_id)
+                offset = out.tell()
+
+                if old_output is not None and old is not None and old["signature"] == signature:
+                    copy_section(old_output, out, old["offset"], old["length"])
+                    rows = old["rows"]
+                else:
+                    text = render_coin(coin_id, write_header=header is None)
+                    if not text:
+                        continue
+                    if header is None:
+                        header, text = text.split("\n", 1)
+                        header += "\n"
+                        out.write(header.encode())
+                        offset = out.tell()
+                    out.write(text.encode())
+                    rows = text.count("\n")
+                    rewritten += 1
+
+                sections[coin_id] = {
+                    "signature": signature,
+                    "offset": offset,
+                    "length": out.tell() - offset,
+                    "rows": rows,
+                }
+                total_rows += rows
+    finally:
+        if old_output is not None:
+            old_output.close()
+
+    os.replace(tmp, OUTPUT)
+    st = os.stat(OUTPUT)
+    with open(MERGE_STATE + ".tmp", "w") as f:
+        json.dump({"header": header, "output": [st.st_size, st.st_mtime_ns], "coins": sections}, f)
+    os.replace(MERGE_STATE + ".tmp", MERGE_STATE)
+    return total_rows, rewritten, len(sections)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge per-coin history into all_coins.csv")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only re-render coins whose source files changed since the last merge")
+    args = parser.parse_args()
+
+    total_rows, rewritten, coins = merge(args.incremental)
+    print(f"Created {OUTPUT} with {total_rows} rows ({rewritten}/{coins} coin sections rewritten)")
 
-# merge
-all_df = pd.concat(rows, ignore_index=True)
-all_df = all_df.sort_values(["coin_id", "date"])
-all_df.to_csv(OUTPUT, index=False)
 
-print(f"Created {OUTPUT} with {len(all_df)} rows")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import manifest
+
+# =======================
+# CONFIG
+# =======================
+# Coins no provider has data for; stored next to the watermark manifest
+NEGATIVE_CACHE_PATH = manifest.MANIFEST_PATH
+# Skip window after the first empty run, doubled on every further empty run
+BASE_BACKOFF = timedelta(days=1)
+MAX_BACKOFF = timedelta(days=30)
+
+_lock = threading.Lock()
+
+
+def _connect(path=NEGATIVE_CACHE_PATH):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS negative_cache (
+        coin_id TEXT PRIMARY KEY,
+        empty_runs INTEGER,
+        last_checked TEXT,
+        next_retry TEXT
+    )
+    """)
+    return conn
+
+
+def next_retry_at(coin_id, path=NEGATIVE_CACHE_PATH):
+    """When the coin may be checked again, or None if it is not in the cache."""
+    with _lock:
+        conn = _connect(path)
+        try:
+            row = conn.execute("SELECT next_retry FROM negative_cache WHERE coin_id = ?", (coin_id,)).fetchone()
+        finally:
+            conn.close()
+    return datetime.fromisoformat(row[0]) if row else None
+
+
+def should_skip(coin_id, now=None, path=NEGATIVE_CACHE_PATH):
+    retry = next_retry_at(coin_id, path)
+    return retry is not None and (now or datetime.now()) < retry
+
+
+def record_empty(coin_id, now=None, path=NEGATIVE_CACHE_PATH):
+    """Count another run with no data from any provider and push the next retry out exponentially."""
+    now = now or datetime.now()
+    with _lock:
+        conn = _connect(path)
+        try:
+            with conn:
+                row = conn.execute("SELECT empty_runs FROM negative_cache WHERE coin_id = ?", (coin_id,)).fetchone()
+                empty_runs = (row[0] if row else 0) + 1
+                backoff = min(BASE_BACKOFF * (2 ** (empty_runs - 1)), MAX_BACKOFF)
+                next_retry = now + backoff
+                conn.execute("""
+                INSERT INTO negative_cache (coin_id, empty_runs, last_checked, next_retry)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(coin_id) DO UPDATE SET
+                    empty_runs = excluded.empty_runs,
+                    last_checked = excluded.last_checked,
+                    next_retry = excluded.next_retry
+                """, (coin_id, empty_runs, now.isoformat(), next_retry.isoformat()))
+        finally:
+            conn.close()
+    return next_retry
+
+
+def record_found(coin_id, path=NEGATIVE_CACHE_PATH):
+    with _lock:
+        conn = _connect(path)
+        try:
+            with conn:
+                conn.execute("DELETE FROM negative_cache WHERE coin_id = ?", (coin_id,))
+        finally:
+            conn.close()
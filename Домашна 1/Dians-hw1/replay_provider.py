@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import random
+import argparse
+import threading
+import requests
+import pandas as pd
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+import http_client
+
+# =======================
+# CONFIG
+# =======================
+# fixtures/<source>/<key>.csv  (key = symbol for yahoo/binance, coin_id for coingecko)
+# fixtures/<source>/<key>.empty marks a recorded "no data" answer
+# fixtures/coingecko_markets/page_<n>.json holds Filter 1 pages
+FIXTURE_DIR = "fixtures"
+# Requests under this prefix are answered by the stand-in's transport (Filter 1 pages, fetch_coingecko)
+COINGECKO_PREFIX = "https://api.coingecko.com/"
+
+
+def log(msg):
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{ts}] {msg}")
+
+
+def fixture_path(source, key, ext="csv"):
+    return os.path.join(FIXTURE_DIR, source, f"{key}.{ext}")
+
+
+# =======================
+# RECORD
+# =======================
+def save_fixture(source, key, df):
+    os.makedirs(os.path.join(FIXTURE_DIR, source), exist_ok=True)
+    if df is None or df.empty:
+        open(fixture_path(source, key, "empty"), "w").close()
+        return
+    df.to_csv(fixture_path(source, key), index=False)
+
+
+def record_filter1_pages(max_pages):
+    url = "https://api.coingecko.com/api/v3/coins/markets"
+    os.makedirs(os.path.join(FIXTURE_DIR, "coingecko_markets"), exist_ok=True)
+    recorded = 0
+    for page in range(1, max_pages + 1):
+        response = http_client.get(url, params={
+            "vs_currency": "usd",
+            "order": "market_cap_desc",
+            "per_page": 250,
+            "page": page,
+            "sparkline": "false",
+        })
+        if response.status_code != 200:
+            log(f"Page {page}: status {response.status_code}, stopping")
+            break
+        with open(os.path.join(FIXTURE_DIR, "coingecko_markets", f"page_{page}.json"), "w") as f:
+            f.write(response.text)
+        recorded += 1
+        if not response.json():
+            break
+    log(f"Recorded {recorded} Filter 1 pages")
+
+
+def record(limit):
+    """Call every real provider once per coin (full history) and store the answers as fixtures."""
+    import filter_2_and_3 as f23
+    coins = pd.read_csv(f23.COINS_CSV, dtype=str).head(limit)
+    for i, row in coins.iterrows():
+        coin_id = row["id"]
+        symbol = row["symbol"].upper()
+        log(f"[{i + 1}/{len(coins)}] recording {symbol} ({coin_id})")
+        save_fixture("yahoo", symbol, f23.fetch_yahoo(symbol))
+        save_fixture("binance", symbol, f23.fetch_binance_spot(symbol))
+        save_fixture("coingecko", coin_id, f23.fetch_coingecko(coin_id))
+
+
+# =======================
+# REPLAY
+# =======================
+class StandInTransport(BaseAdapter):
+    """requests transport adapter that hands every request to StandIn.http_response."""
+
+    def __init__(self, stand_in):
+        super().__init__()
+        self.stand_in = stand_in
+
+    def send(self, request, **kwargs):
+        return self.stand_in.http_response(request)
+
+    def close(self):
+        pass
+
+
+def _response(request, status, body=b"", headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.reason = "Too Many Requests" if status == 429 else "OK"
+    response._content = body
+    response.headers = CaseInsensitiveDict(headers or {})
+    response.encoding = "utf-8"
+    response.url = request.url
+    response.request = request
+    return response
+
+
+class StandIn:
+    """
+    Local stand-in for Yahoo, Binance and CoinGecko that serves recorded fixtures.
+    Every call waits `latency` (+ uniform `jitter`) seconds and, with probability
+    `error_rate`, is rate limited first.
+    CoinGecko is served at the HTTP transport of http_client's session: a rate-limited
+    request gets a real 429 with Retry-After: `retry_after`, and http_client's own
+    backoff and retries handle it. Yahoo and Binance go through their client libraries,
+    which are replaced in-process, so there a 429 costs `retry_after` seconds of waiting
+    before the retry, as those clients would wait.
+    """
+
+    def __init__(self, latency=0.2, jitter=0.1, error_rate=0.0, retry_after=1.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.frames = {}
+        self.stats = {"calls": 0, "injected_429": 0, "empty": 0}
+
+    def _roll(self):
+        with self.lock:
+            return self.random.random(), self.random.uniform(0, self.jitter)
+
+    def _count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def _load(self, source, key):
+        cache_key = (source, key)
+        if cache_key not in self.frames:
+            path = fixture_path(source, key)
+            df = None
+            if os.path.exists(path):
+                df = pd.read_csv(path)
+                df["date"] = pd.to_datetime(df["date"]).dt.date
+            self.frames[cache_key] = df
+        return self.frames[cache_key]
+
+    def _latency(self):
+        roll, jitter = self._roll()
+        time.sleep(self.latency + jitter)
+        return roll
+
+    def _wait(self):
+        roll = self._latency()
+        while roll < self.error_rate:
+            self._count("injected_429")
+            time.sleep(self.retry_after)
+            roll = self._latency()
+
+    def respond(self, source, key, since=None, until=None):
+        self._count("calls")
+        self._wait()
+        df = self._load(source, key)
+        if df is not None and since is not None:
+            df = df[df["date"] >= since]
+        if df is not None and until is not None:
+            df = df[df["date"] <= until]
+        if df is None or df.empty:
+            self._count("empty")
+            return None
+        return df.copy()
+
+    def respond_batch(self, symbols, since=None):
+        self._count("calls")
+        self._wait()
+        results = {}
+        for symbol in symbols:
+            df = self._load("yahoo", symbol)
+            if df is not None and since is not None:
+                df = df[df["date"] >= since]
+            results[symbol] = None if df is None or df.empty else df.copy()
+        return results
+
+    def _market_chart(self, coin_id):
+        """A recorded coingecko fixture as the /market_chart JSON fetch_coingecko parses."""
+        df = self._load("coingecko", coin_id)
+        if df is None or df.empty:
+            self._count("empty")
+            return b'{"prices": [], "total_volumes": []}'
+        ts = (pd.to_datetime(df["date"]).astype("int64") // 10 ** 6).tolist()
+        return json.dumps({
+            "prices": [list(p) for p in zip(ts, df["close"].tolist())],
+            "total_volumes": [list(v) for v in zip(ts, df["volume"].tolist())],
+        }).encode()
+
+    def http_response(self, request):
+        """Answer one CoinGecko request: recorded market pages (Filter 1) or market charts."""
+        if self._latency() < self.error_rate:
+            self._count("injected_429")
+            return _response(request, 429, headers={"Retry-After": f"{self.retry_after:g}"})
+        self._count("calls")
+        url = urlsplit(request.url)
+        if url.path.endswith("/coins/markets"):
+            page = parse_qs(url.query).get("page", [None])[0]
+            path = os.path.join(FIXTURE_DIR, "coingecko_markets", f"page_{page}.json")
+            if not os.path.exists(path):
+                return _response(request, 200, b"[]")
+            with open(path, "rb") as f:
+                return _response(request, 200, f.read())
+        if url.path.endswith("/market_chart"):
+            return _response(request, 200, self._market_chart(url.path.split("/")[-2]))
+        return _response(request, 404)
+
+    def install(self, f23):
+        """
+        Point filter_2_and_3's fetchers at the stand-in (no network): Yahoo and Binance in-process,
+        CoinGecko at the HTTP transport (install_http), so the real fetch_coingecko and
+        http_client retries run. The per-source token buckets still apply, so schedulers are
+        measured under real limits, and calls are recorded in f23.METRICS like real ones.
+        """
+        def limited(source, fn):
+            @f23.instrumented(source)
+            def call(*args, **kwargs):
+                f23.RATE_LIMITERS[source].acquire()
+                return fn(*args, **kwargs)
+            return call
+
+        f23.fetch_yahoo = limited("yahoo", lambda symbol, since=None, until=None:
+                                  self.respond("yahoo", symbol, since, until))
+        f23.fetch_binance_spot = limited("binance", lambda symbol, since=None, until=None:
+                                         self.respond("binance", symbol, since, until))
+        f23.fetch_yahoo_batch = limited("yahoo", self.respond_batch)
+        self.install_http()
+
+    def install_http(self):
+        """Serve CoinGecko from the stand-in at the transport of http_client's pooled session."""
+        http_client.get_session().mount(COINGECKO_PREFIX, StandInTransport(self))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record provider responses as fixtures for offline benchmarks")
+    parser.add_argument("--limit", type=int, default=100, help="number of coins from top_1000_coins.csv to record")
+    parser.add_argument("--filter1-pages", type=int, default=0, help="also record N Filter 1 market pages")
+    args = parser.parse_args()
+
+    record(args.limit)
+    if args.filter1_pages:
+        record_filter1_pages(args.filter1_pages)
+    with open(os.path.join(FIXTURE_DIR, "recorded.json"), "w") as f:
+        json.dump({"coins": args.limit, "recorded_at": datetime.now().isoformat()}, f)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import os
+import argparse
+import pandas as pd
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import history_store
+import hourly_store
+
+# =======================
+# CONFIG
+# =======================
+# rollups/<interval>/<coin_id>.csv with date, open, high, low, close, volume, bars
+# (bars = hours in a day, days in a week / month; week / month also count in
+# hourly_days the days that came from hourly data instead of the daily history).
+# "date" labels the period by its last day, like pandas' resample("W") / resample("M")
+# that the web views used: weeks end on Sunday, months on their last day.
+# "day" only exists for coins with hourly data (it is built from the hours);
+# "week" and "month" are built from the daily history, extended by those hourly days
+# past the history's last date, so the running week / month is current between daily runs.
+ROLLUP_DIR = "rollups"
+INTERVALS = ["day", "week", "month"]
+ROLLUP_WORKERS = 4
+
+OHLCV_COLUMNS = history_store.OHLCV_COLUMNS
+AGG = {"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum",
+       "bars": "sum", "hourly_days": "sum"}
+
+
+def log(msg):
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{ts}] {msg}")
+
+
+def rollup_path(coin_id, interval):
+    return os.path.join(ROLLUP_DIR, interval, f"{coin_id}.csv")
+
+
+def period_end(dates, interval):
+    """Last day of the day / week (Mon–Sun) / month each date falls in."""
+    days = pd.to_datetime(pd.Series(dates))
+    if interval == "week":
+        days = days + pd.to_timedelta(6 - days.dt.weekday, unit="D")
+    elif interval == "month":
+        days = days + pd.offsets.MonthEnd(0)
+    return days.dt.date
+
+
+def period_start(end, interval):
+    if interval == "week":
+        return end - timedelta(days=6)
+    if interval == "month":
+        return end.replace(day=1)
+    return end
+
+
+def aggregate(df, key, interval):
+    """OHLCV rows (time column `key`) → one bar per period."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=OHLCV_COLUMNS + ["bars"])
+    df = df.sort_values(key).assign(bars=1)
+    agg = {col: how for col, how in AGG.items() if col in df.columns}
+    bars = df.groupby(period_end(df[key], interval).values, sort=True).agg(agg)
+    bars.index.name = "date"
+    return bars.reset_index()
+
+
+def read_rollup(coin_id, interval, since=None):
+    path = rollup_path(coin_id, interval)
+    if not os.path.exists(path):
+        return None
+    df = pd.read_csv(path)
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    if since is not None:
+        df = df[df["date"] >= since]
+    return df
+
+
+def _write_rollup(coin_id, interval, df):
+    os.makedirs(os.path.join(ROLLUP_DIR, interval), exist_ok=True)
+    path = rollup_path(coin_id, interval)
+    tmp = path + ".tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _tail(coin_id, interval, full):
+    """
+    Bars that stay as they are, and the first day whose period has to be recomputed (None = all).
+    That is the newest period, or an older one if it still holds days built from hourly
+    data, which the daily history may have caught up on since.
+    """
+    existing = None if full else read_rollup(coin_id, interval)
+    if existing is None or existing.empty:
+        return None, None
+    redo_from = existing["date"].max()
+    if "hourly_days" in existing.columns:
+        provisional = existing.loc[existing["hourly_days"] > 0, "date"]
+        if not provisional.empty:
+            redo_from = min(redo_from, provisional.min())
+    return existing[existing["date"] < redo_from], period_start(redo_from, interval)
+
+
+def _update_days(coin_id, full):
+    """Daily bars from the stored hours; only the last stored day and newer days are recomputed."""
+    if not hourly_store.has_hourly(coin_id):
+        return 0
+    keep, since = _tail(coin_id, "day", full)
+    since_hour = datetime.combine(since, datetime.min.time()) if since is not None else None
+    hours = hourly_store.read_hourly(coin_id, since=since_hour)
+    fresh = aggregate(hours, "datetime", "day")
+    if keep is not None:
+        fresh = pd.concat([keep, fresh], ignore_index=True)
+    _write_rollup(coin_id, "day", fresh)
+    return len(fresh)
+
+
+def daily_bars(coin_id, since=None):
+    """Daily history from `since` on, extended by hourly-built days past the history's last date."""
+    daily = history_store.read_history(coin_id, columns=OHLCV_COLUMNS, since=since)
+    if daily is not None:
+        daily = daily.assign(hourly_days=0)
+    last = daily["date"].max() if daily is not None and not daily.empty else history_store.last_date(coin_id)
+    from_hours = read_rollup(coin_id, "day")
+    if from_hours is not None and not from_hours.empty:
+        cutoff = last if last is not None else (since - timedelta(days=1) if since is not None else None)
+        if cutoff is not None:
+            from_hours = from_hours[from_hours["date"] > cutoff]
+        from_hours = from_hours[OHLCV_COLUMNS].assign(hourly_days=1)
+        parts = [df for df in (daily, from_hours) if df is not None and not df.empty]
+        daily = pd.concat(parts, ignore_index=True) if parts else None
+    return daily
+
+
+def update_coin(coin_id, full=False):
+    """
+    Bring the coin's rollups up to date. Only the newest stored period of each interval
+    can still change, so it is dropped and rebuilt from its first day on; older bars are
+    kept as they are. full=True rebuilds everything (e.g. after gaps were repaired).
+    """
+    _update_days(coin_id, full)
+    counts = {}
+    for interval in ("week", "month"):
+        keep, since = _tail(coin_id, interval, full)
+        daily = daily_bars(coin_id, since)
+        fresh = aggregate(daily, "date", interval)
+        if keep is not None:
+            fresh = pd.concat([keep, fresh], ignore_index=True)
+        if fresh.empty:
+            continue
+        _write_rollup(coin_id, interval, fresh)
+        counts[interval] = len(fresh)
+    return counts
+
+
+def list_coins():
+    return sorted(set(history_store.list_coins()) | set(hourly_store.list_coins()))
+
+
+def update_all(full=False, workers=ROLLUP_WORKERS):
+    coins = list_coins()
+    start = datetime.now()
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        for coin_id, counts in zip(coins, pool.map(lambda c: update_coin(c, full), coins)):
+            if counts:
+                log(f"{coin_id}: " + ", ".join(f"{n} {interval} bars" for interval, n in counts.items()))
+    log(f"Rolled up {len(coins)} coins in {datetime.now() - start}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain day / week / month OHLCV rollups")
+    parser.add_argument("--full", action="store_true", help="rebuild all bars instead of only the newest period")
+    parser.add_argument("--workers", type=int, default=ROLLUP_WORKERS)
+    parser.add_argument("--backend", choices=["csv", "parquet"], default=history_store.STORAGE_BACKEND)
+    args = parser.parse_args()
+    history_store.STORAGE_BACKEND = args.backend
+    update_all(args.full, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import os
+import json
+import uuid
+import threading
+from datetime import datetime
+
+# =======================
+# CONFIG
+# =======================
+# One append-only JSON lines file per run, run_journal/<run_id>.jsonl: one "start" record
+# (and one per resume), one record per finished coin, one "done" record. The first start record
+# holds the run's mode and the ids of the coins it covers. Run ids start with the start time,
+# so the newest run is the last file by name; only that file is read to resume.
+JOURNAL_DIR = "run_journal"
+# Journals of older runs beyond this many are deleted when a new run starts
+KEEP_RUNS = 30
+
+OUTCOMES = {True: "ok", False: "failed", None: "skipped"}
+
+
+def journal_path(run_id, journal_dir=JOURNAL_DIR):
+    return os.path.join(journal_dir, f"{run_id}.jsonl")
+
+
+def run_ids(journal_dir=JOURNAL_DIR):
+    """Journaled run ids, oldest first."""
+    if not os.path.isdir(journal_dir):
+        return []
+    return sorted(f[:-len(".jsonl")] for f in os.listdir(journal_dir) if f.endswith(".jsonl"))
+
+
+def read_run(run_id, journal_dir=JOURNAL_DIR):
+    """
+    Replay one run's journal into {"done": bool, "mode": str, "coin_ids": [...] | None,
+    "coins": {coin_id: outcome}}. coin_ids is None for runs journaled without it.
+    """
+    run = {"done": False, "mode": "full", "coin_ids": None, "coins": {}}
+    with open(journal_path(run_id, journal_dir)) as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # torn last line after a crash
+            if rec["event"] == "start" and not rec.get("resumed"):
+                run["mode"] = rec.get("mode", "full")
+                run["coin_ids"] = rec.get("coin_ids")
+            elif rec["event"] == "coin":
+                run["coins"][rec["coin_id"]] = rec["outcome"]
+            elif rec["event"] == "done":
+                run["done"] = True
+    return run
+
+
+def last_run(journal_dir=JOURNAL_DIR):
+    ids = run_ids(journal_dir)
+    if not ids:
+        return None, None
+    return ids[-1], read_run(ids[-1], journal_dir)
+
+
+def prune(keep=KEEP_RUNS, journal_dir=JOURNAL_DIR):
+    for run_id in run_ids(journal_dir)[:-keep]:
+        os.remove(journal_path(run_id, journal_dir))
+
+
+class RunJournal:
+    """
+    Records each finished coin of a Filter 2/3 run. Writes are a single appended,
+    flushed line under a lock, so they are cheap enough for the hot loop.
+    """
+
+    def __init__(self, run_id=None, journal_dir=JOURNAL_DIR):
+        """run_id=None starts a new run (and prunes old journals); an existing run_id resumes it."""
+        os.makedirs(journal_dir, exist_ok=True)
+        if run_id is None:
+            run_id = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:6]}"
+            prune(KEEP_RUNS - 1, journal_dir)
+        self.run_id = run_id
+        self.path = journal_path(run_id, journal_dir)
+        self.lock = threading.Lock()
+        self.file = open(self.path, "a")
+
+    def _write(self, rec):
+        rec["run_id"] = self.run_id
+        rec["ts"] = datetime.now().isoformat(timespec="seconds")
+        with self.lock:
+            self.file.write(json.dumps(rec) + "\n")
+            self.file.flush()
+
+    def start(self, coin_ids, mode="full", resumed=False):
+        """coin_ids: every coin the run covers (for a resume, the original list, not what is left)."""
+        coin_ids = list(coin_ids)
+        self._write({"event": "start", "total": len(coin_ids), "resumed": resumed, "mode": mode,
+                     "coin_ids": coin_ids})
+
+    def record(self, coin_id, result):
+        self._write({"event": "coin", "coin_id": coin_id, "outcome": OUTCOMES[result]})
+
+    def done(self):
+        self._write({"event": "done"})
+        self.close()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
@@ -0,0 +1,90 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+import manifest
+
+# =======================
+# CONFIG
+# =======================
+# Stored next to the watermark manifest (same SQLite file, separate table)
+AFFINITY_PATH = manifest.MANIFEST_PATH
+# Consecutive failures of the preferred source before it loses its place at the front
+DEMOTE_AFTER = 3
+
+_lock = threading.Lock()
+
+
+def _connect(path=AFFINITY_PATH):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS source_affinity (
+        symbol TEXT PRIMARY KEY,
+        source TEXT,
+        failures INTEGER DEFAULT 0,
+        updated_at TEXT
+    )
+    """)
+    return conn
+
+
+def preferred_source(symbol, path=AFFINITY_PATH):
+    with _lock:
+        conn = _connect(path)
+        try:
+            row = conn.execute("SELECT source FROM source_affinity WHERE symbol = ?", (symbol,)).fetchone()
+        finally:
+            conn.close()
+    return row[0] if row else None
+
+
+def ordered_sources(symbol, default_order, path=AFFINITY_PATH):
+    """default_order with the symbol's last winning source moved to the front."""
+    preferred = preferred_source(symbol, path)
+    if preferred not in default_order:
+        return list(default_order)
+    return [preferred] + [s for s in default_order if s != preferred]
+
+
+def record_success(symbol, source, path=AFFINITY_PATH):
+    with _lock:
+        conn = _connect(path)
+        try:
+            with conn:
+                conn.execute("""
+                INSERT INTO source_affinity (symbol, source, failures, updated_at)
+                VALUES (?, ?, 0, ?)
+                ON CONFLICT(symbol) DO UPDATE SET
+                    source = excluded.source,
+                    failures = 0,
+                    updated_at = excluded.updated_at
+                """, (symbol, source, datetime.now().isoformat()))
+        finally:
+            conn.close()
+
+
+def record_failure(symbol, source, path=AFFINITY_PATH):
+    """
+    Count a failure of the symbol's preferred source; after DEMOTE_AFTER in a row
+    the affinity is dropped and the default order applies again.
+    Failures of non-preferred sources are ignored.
+    """
+    with _lock:
+        conn = _connect(path)
+        try:
+            with conn:
+                row = conn.execute(
+                    "SELECT source, failures FROM source_affinity WHERE symbol = ?", (symbol,)
+                ).fetchone()
+                if row is None or row[0] != source:
+                    return False
+                failures = row[1] + 1
+                demoted = failures >= DEMOTE_AFTER
+                conn.execute(
+                    "UPDATE source_affinity SET source = ?, failures = ?, updated_at = ? WHERE symbol = ?",
+                    (None if demoted else source, 0 if demoted else failures,
+                     datetime.now().isoformat(), symbol)
+                )
+                return demoted
+        finally:
+            conn.close()
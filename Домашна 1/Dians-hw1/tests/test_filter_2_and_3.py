@@ -0,0 +1,120 @@
+import time
+import threading
+import unittest
+from unittest import mock
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import filter_2_and_3 as f23
+
+# Run from the Dians-hw1 directory:
+#   python -m unittest discover -s tests -t .
+
+
+class InterleavingDownload:
+    """Stand-in for yf.download that notes any call starting while another one is running."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.overlaps = 0
+
+    def __call__(self, tickers, **kwargs):
+        with self.lock:
+            self.active += 1
+            if self.active > 1:
+                self.overlaps += 1
+        try:
+            time.sleep(0.02)  # long enough for the other workers to get in if nothing stops them
+            price = float(sum(map(ord, tickers)))
+            index = pd.DatetimeIndex(pd.date_range("2024-01-01", periods=3), name="Date")
+            return pd.DataFrame({"Open": price, "High": price, "Low": price, "Close": price, "Volume": 1.0},
+                                index=index)
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+class FetchYahooConcurrencyTests(unittest.TestCase):
+    def setUp(self):
+        self.limiters = f23.RATE_LIMITERS
+        f23.RATE_LIMITERS = {s: f23.TokenBucket(1e9, 1e9) for s in f23.RATE_LIMITS}
+
+    def tearDown(self):
+        f23.RATE_LIMITERS = self.limiters
+
+    def test_concurrent_fetches_do_not_interleave(self):
+        download = InterleavingDownload()
+        symbols = [f"C{i}" for i in range(16)]
+        with mock.patch.object(f23.yf, "download", download):
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                frames = dict(zip(symbols, pool.map(f23.fetch_yahoo, symbols)))
+
+        self.assertEqual(download.overlaps, 0)
+        for symbol, df in frames.items():
+            # each coin got its own frame, as the serial loop would
+            self.assertIsNotNone(df, symbol)
+            self.assertEqual(len(df), 3)
+            self.assertTrue((df["close"] == float(sum(map(ord, f"{symbol}-USD")))).all(), symbol)
+
+
+class AffinityDemotionTests(unittest.TestCase):
+    """Unless a test says otherwise, Yahoo is the preferred source and has nothing; Binance has the rows."""
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(f23.source_affinity, "ordered_sources", return_value=["yahoo", "binance", "coingecko"]),
+            mock.patch.object(f23.source_affinity, "record_failure", return_value=False),
+            mock.patch.object(f23.source_affinity, "record_success"),
+            mock.patch.object(f23, "fetch_from", side_effect=self.fetch_from),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    @staticmethod
+    def fetch_from(source, symbol, coin_id, since=None, until=None):
+        if source != "binance":
+            return None
+        return pd.DataFrame({"date": [since or date(2024, 1, 1)], "open": 1.0, "high": 1.0,
+                             "low": 1.0, "close": 1.0, "volume": 1.0})
+
+    def test_empty_full_download_counts_as_failure(self):
+        self.assertIsNotNone(f23.try_all_sources("BTC", "bitcoin"))
+        f23.source_affinity.record_failure.assert_called_once_with("BTC", "yahoo")
+        f23.source_affinity.record_success.assert_called_once_with("BTC", "binance")
+
+    def test_empty_range_that_should_have_rows_counts_as_failure(self):
+        f23.try_all_sources("BTC", "bitcoin", since=date.today() - timedelta(days=10))
+        f23.source_affinity.record_failure.assert_called_once_with("BTC", "yahoo")
+
+    def test_up_to_date_incremental_run_is_not_a_failure(self):
+        f23.try_all_sources("BTC", "bitcoin", since=date.today())
+        f23.source_affinity.record_failure.assert_not_called()
+
+    def test_gap_repair_leaves_affinity_alone(self):
+        start = date.today() - timedelta(days=400)
+        self.assertIsNotNone(f23.try_all_sources("BTC", "bitcoin", since=start, until=start, affinity=False))
+        f23.source_affinity.record_failure.assert_not_called()
+        f23.source_affinity.record_success.assert_not_called()
+
+
+    def test_prefetched_yahoo_frame_is_used_before_the_preferred_source(self):
+        f23.source_affinity.ordered_sources.return_value = ["binance", "yahoo", "coingecko"]
+        batched = self.fetch_from("binance", "BTC", "bitcoin")
+        df = f23.try_all_sources("BTC", "bitcoin", prefetched={"yahoo": batched})
+        self.assertIs(df, batched)
+        self.assertEqual(df.attrs["source"], "yahoo")
+        f23.fetch_from.assert_not_called()
+
+    def test_empty_prefetched_yahoo_frame_keeps_the_affinity_order(self):
+        f23.source_affinity.ordered_sources.return_value = ["binance", "yahoo", "coingecko"]
+        df = f23.try_all_sources("BTC", "bitcoin", prefetched={"yahoo": None})
+        self.assertEqual(df.attrs["source"], "binance")
+        f23.fetch_from.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
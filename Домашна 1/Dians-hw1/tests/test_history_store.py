@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import manifest
+import history_store
+
+# Run from the Dians-hw1 directory:
+#   python -m unittest discover -s tests -t .
+
+
+def frame(dates, price):
+    return pd.DataFrame({"date": pd.to_datetime(dates), "open": price, "high": price,
+                         "low": price, "close": price, "volume": price})
+
+
+@unittest.skipIf(history_store.pa is None, "the parquet backend requires pyarrow")
+class ParquetCompactionTests(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.dir = tempfile.mkdtemp()
+        os.chdir(self.dir)
+        self.backend = history_store.STORAGE_BACKEND
+        history_store.STORAGE_BACKEND = "parquet"
+
+    def tearDown(self):
+        history_store.STORAGE_BACKEND = self.backend
+        os.chdir(self.cwd)
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_part_appended_during_compaction_is_kept(self):
+        history_store.save_history("c", frame(["2024-01-01", "2024-01-02"], 1.0))
+        history_store.append_history("c", frame(["2024-01-03"], 1.0))
+
+        write_table = history_store.pq.write_table
+        appended = []
+
+        def append_then_write(table, path):
+            # lands after compaction listed and read the parts, before they are replaced
+            if not appended:
+                appended.append(True)
+                history_store.append_history("c", frame(["2024-01-02", "2024-01-04"], 9.0))
+            return write_table(table, path)
+
+        with mock.patch.object(history_store.pq, "write_table", append_then_write):
+            self.assertTrue(history_store.compact("c"))
+
+        df = history_store.read_history("c")
+        self.assertEqual([str(d) for d in df["date"]], ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"])
+        # the stored row for 2024-01-02 still wins over the later append
+        self.assertEqual(df["close"].tolist(), [1.0, 1.0, 1.0, 9.0])
+        entry = manifest.get_entry("c")
+        self.assertEqual(entry["row_count"], 4)
+        self.assertEqual(entry["checksum"], history_store.history_checksum("c"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -40,6 +40,26 @@ class OhlcvData(models.Model):
         unique_together = (('coin_id', 'date'),)
 
 
+class OhlcvRollup(models.Model):
+    coin_id = models.CharField(primary_key=True,
+                               max_length=100)  # Composite primary key (coin_id, bar_interval, date); the first column is selected.
+    symbol = models.CharField(max_length=20, blank=True, null=True)
+    bar_interval = models.CharField(max_length=10)  # "week" (ends Sunday) or "month" (ends on its last day)
+    date = models.DateField()
+    open = models.FloatField(blank=True, null=True)
+    high = models.FloatField(blank=True, null=True)
+    low = models.FloatField(blank=True, null=True)
+    close = models.FloatField(blank=True, null=True)
+    volume = models.FloatField(blank=True, null=True)
+    bars = models.IntegerField(blank=True, null=True)
+    hourly_days = models.IntegerField(blank=True, null=True)
+
+    class Meta:
+        managed = False
+        db_table = 'ohlcv_rollup'
+        unique_together = (('coin_id', 'bar_interval', 'date'),)
+
+
 class News(models.Model):
     symbol = models.CharField(max_length=20, blank=True, null=True)
     title = models.TextField(blank=True, null=True)
@@ -12,4 +12,5 @@ urlpatterns = [
     path("lstm/", views.lstm_page, name="lstm_page"),
     path("onchain-sentiment/", views.onchain_sentiment_page, name="onchain_sentiment_page"),
     path("onchain-sentiment/refresh/", views.trigger_onchain_sentiment_pipeline, name="trigger_onchain_sentiment_pipeline"),
+    path("onchain-sentiment/status/", views.onchain_sentiment_status, name="onchain_sentiment_status"),
 ]
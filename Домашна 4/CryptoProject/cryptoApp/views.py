@@ -3,11 +3,14 @@ import pandas as pd
 from datetime import date
 import requests
 from django.contrib.auth.models import User
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from .forms import SignupUserForm, CoinFilterForm, OnchainSentimentForm
-from .models import Coins, OhlcvData, News, OnchainMetrics
+from .models import Coins, OhlcvData, OhlcvRollup, News, OnchainMetrics
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
+from django.db import DatabaseError
+from django.db.models import Max
 
 
 # Create your views here.
@@ -174,6 +177,54 @@ def coin_detail(request, symbol):
 TECHNICAL_ANALYSIS_SERVICE_URL = "http://127.0.0.1:8001/api/technical-analysis/"  # Microservice URL
 
 
+OHLCV_FIELDS = ("date", "open", "high", "low", "close", "volume")
+
+# Page timeframe / granularity → ohlcv_rollup.bar_interval
+ROLLUP_INTERVALS = {"1week": "week", "weekly": "week", "1month": "month", "monthly": "month"}
+RESAMPLE_RULES = {"week": "W", "month": "M"}
+
+
+def _ohlcv_frame(rows):
+    df = pd.DataFrame(list(rows))
+    if df.empty:
+        return df
+    df[["open", "high", "low", "close", "volume"]] = df[["open", "high", "low", "close", "volume"]].astype(float)
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+
+def load_ohlcv_bars(symbol, timeframe):
+    """
+    OHLCV bars of a symbol, oldest first. Weekly / monthly bars are read pre-aggregated
+    from ohlcv_rollup (filled by the Dians-hw1 rollup stage); if it has none for the
+    symbol, or its newest bar ends before the period of the newest daily row (the daily
+    load ran, the rollup load not yet), the daily rows are resampled here.
+    """
+    interval = ROLLUP_INTERVALS.get(timeframe)
+    if interval:
+        try:
+            rollup = OhlcvRollup.objects.filter(symbol=symbol, bar_interval=interval).order_by("date")
+            df = _ohlcv_frame(rollup.values(*OHLCV_FIELDS))
+        except DatabaseError:
+            df = pd.DataFrame()  # rollup table not created yet
+        if not df.empty:
+            latest = OhlcvData.objects.filter(symbol=symbol).aggregate(latest=Max("date"))["latest"]
+            rule = RESAMPLE_RULES[interval]
+            if latest is None or pd.Timestamp(latest).to_period(rule) <= df["date"].iloc[-1].to_period(rule):
+                return df
+
+    df = _ohlcv_frame(OhlcvData.objects.filter(symbol=symbol).order_by("date").values(*OHLCV_FIELDS))
+    if interval and not df.empty:
+        df = df.resample(RESAMPLE_RULES[interval], on="date").agg({
+            "open": "first",
+            "high": "max",
+            "low": "min",
+            "close": "last",
+            "volume": "sum"
+        }).reset_index()
+    return df
+
+
 def technical_analysis_page(request):
     symbols = Coins.objects.values_list("symbol", flat=True).order_by("market_cap_rank")
     context = {"symbols": symbols}
@@ -182,35 +233,13 @@ def technical_analysis_page(request):
         symbol = request.POST.get("symbol")
         timeframe = request.POST.get("timeframe")
 
-        # Fetch OHLCV data from DB
-        ohlcv = OhlcvData.objects.filter(symbol=symbol).order_by("date")
-        df = pd.DataFrame(list(ohlcv.values("date", "open", "high", "low", "close", "volume")))
+        # Fetch OHLCV bars from DB (weekly / monthly come pre-aggregated)
+        df = load_ohlcv_bars(symbol, timeframe)
 
         if df.empty:
             context["error"] = "No data found for this symbol."
             return render(request, "technical_analysis.html", context)
 
-        df[["open", "high", "low", "close", "volume"]] = df[["open", "high", "low", "close", "volume"]].astype(float)
-        df["date"] = pd.to_datetime(df["date"])
-
-        # Resample if needed
-        if timeframe == "1week":
-            df = df.resample("W", on="date").agg({
-                "open": "first",
-                "high": "max",
-                "low": "min",
-                "close": "last",
-                "volume": "sum"
-            }).reset_index()
-        elif timeframe == "1month":
-            df = df.resample("M", on="date").agg({
-                "open": "first",
-                "high": "max",
-                "low": "min",
-                "close": "last",
-                "volume": "sum"
-            }).reset_index()
-
         # Send OHLCV to microservice for indicators
         try:
             df_to_send = df.copy()
@@ -372,42 +401,14 @@ def lstm_page(request):
         horizon = int(request.POST.get("horizon", 7))
         granularity = request.POST.get("granularity", "daily")
 
-        # Fetch OHLCV data from database
-        ohlcv = OhlcvData.objects.filter(symbol=symbol).order_by("date")
-        df = pd.DataFrame(list(ohlcv.values(
-            "date", "open", "high", "low", "close", "volume"
-        )))
+        # Fetch OHLCV bars at the requested granularity (weekly / monthly come pre-aggregated)
+        df = load_ohlcv_bars(symbol, granularity)
 
-        # Ensure enough data for LSTM training
+        # Ensure enough bars for LSTM training
         if df.empty or len(df) < (lookback + 20):
             context["error"] = "Not enough data for LSTM prediction."
             return render(request, "lstm.html", context)
 
-        # Data cleaning & type casting
-        df["date"] = pd.to_datetime(df["date"])
-        df[["open", "high", "low", "close", "volume"]] = df[
-            ["open", "high", "low", "close", "volume"]
-        ].astype(float)
-
-        # Resample data if needed
-        if granularity == "weekly":
-            df = df.resample("W", on="date").agg({
-                "open": "first",
-                "high": "max",
-                "low": "min",
-                "close": "last",
-                "volume": "sum"
-            }).reset_index()
-
-        elif granularity == "monthly":
-            df = df.resample("M", on="date").agg({
-                "open": "first",
-                "high": "max",
-                "low": "min",
-                "close": "last",
-                "volume": "sum"
-            }).reset_index()
-
         # Convert dates to JSON-safe format
         df["date"] = df["date"].dt.strftime("%Y-%m-%d")
 
@@ -613,14 +614,24 @@ ONCHAIN_SENTIMENT_SERVICE_URL = "http://localhost:8003/api/onchain-sentiment/"
 
 def trigger_onchain_sentiment_pipeline(request):
     try:
-        requests.post(
+        response = requests.post(
             ONCHAIN_SENTIMENT_SERVICE_URL,
             timeout=2
         )
-        messages.success(
-            request,
-            "On-chain and Sentiment pipeline started in background"
-        )
+        response.raise_for_status()
+        job = response.json()
+        # the service hands back the run already in progress instead of starting a second one
+        request.session["onchain_sentiment_job"] = job["job_id"]
+        if job["status"] == "already_running":
+            messages.info(
+                request,
+                f"On-chain and Sentiment pipeline is already running (job {job['job_id']})"
+            )
+        else:
+            messages.success(
+                request,
+                f"On-chain and Sentiment pipeline started in background (job {job['job_id']})"
+            )
     except Exception:
         messages.error(
             request,
@@ -628,3 +639,21 @@ def trigger_onchain_sentiment_pipeline(request):
         )
 
     return redirect("onchain_sentiment_page")
+
+
+def onchain_sentiment_status(request):
+    """Status of the pipeline job this session started (or the latest one), polled by the page."""
+    job_id = request.session.get("onchain_sentiment_job")
+    try:
+        response = None
+        if job_id:
+            response = requests.get(f"{ONCHAIN_SENTIMENT_SERVICE_URL}jobs/{job_id}/", timeout=2)
+        if response is None or response.status_code == 404:
+            # no job in this session, or the service restarted since
+            response = requests.get(ONCHAIN_SENTIMENT_SERVICE_URL, timeout=2)
+        return JsonResponse(response.json(), status=response.status_code)
+    except Exception:
+        return JsonResponse(
+            {"status": "unavailable", "message": "On-chain and Sentiment service is not reachable"},
+            status=503
+        )
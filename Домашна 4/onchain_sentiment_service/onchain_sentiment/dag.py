@@ -0,0 +1,171 @@
+import time
+import importlib
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from .fingerprint import FingerprintStore, STATE_PATH
+
+
+class Stage:
+    """
+    One pipeline step: `target` is "package.module:function", imported and called in a
+    worker process; `deps` are the names of the stages that have to finish first.
+    `inputs` / `outputs` are the files (paths or globs) the stage reads and writes, and
+    `state` an optional "module:function" returning anything else it depends on. A stage
+    with inputs is skipped when they are unchanged since its last successful run (its own
+    module and the package modules it imports count as inputs); a stage without
+    (downloads, DDL) always runs.
+    `state` is called in the scheduler process, on every run, once the stage's deps are
+    done; keep it cheap. If it raises (e.g. the DB is down) only that stage loses its
+    fingerprint and runs; the rest of the DAG is not affected.
+    """
+
+    def __init__(self, name, target, deps=(), inputs=(), outputs=(), state=None):
+        self.name = name
+        self.target = target
+        self.deps = list(deps)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.state = state
+
+
+class PipelineError(RuntimeError):
+    pass
+
+
+def log(msg):
+    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{ts}] {msg}", flush=True)
+
+
+def topological_order(stages):
+    by_name = {s.name: s for s in stages}
+    for s in stages:
+        missing = [d for d in s.deps if d not in by_name]
+        if missing:
+            raise PipelineError(f"Stage {s.name} depends on unknown stage(s): {', '.join(missing)}")
+
+    order, state = [], {}
+
+    def visit(name, path):
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise PipelineError(f"Dependency cycle: {' -> '.join(path + [name])}")
+        state[name] = "visiting"
+        for dep in by_name[name].deps:
+            visit(dep, path + [name])
+        state[name] = "done"
+        order.append(by_name[name])
+
+    for s in stages:
+        visit(s.name, [])
+    return order
+
+
+def critical_path(stages, durations):
+    """Longest chain of dependent stages by wall time: ([stage names], seconds)."""
+    best = {}
+    for s in topological_order(stages):
+        prev = max((best[d] for d in s.deps), key=lambda p: p[1], default=([], 0.0))
+        best[s.name] = (prev[0] + [s.name], prev[1] + durations.get(s.name, 0.0))
+    return max(best.values(), key=lambda p: p[1], default=([], 0.0))
+
+
+def _run_stage(target):
+    # runs in the worker process; wall-clock times so the parent can line stages up
+    module_name, func_name = target.split(":")
+    func = getattr(importlib.import_module(module_name), func_name)
+    start = time.time()
+    func()
+    return start, time.time()
+
+
+def _fingerprint(store, stage):
+    try:
+        return store.compute(stage)
+    except Exception as e:
+        # can't tell whether the inputs changed (e.g. the DB is down): run the stage
+        log(f"Could not fingerprint {stage.name}: {e!r}")
+        return None
+
+
+def run_dag(stages, max_workers=None, force=False, state_path=STATE_PATH, on_event=None):
+    """
+    Run every stage once its dependencies have finished; independent stages run at the
+    same time, each in its own process. Stages whose inputs are unchanged since their
+    last successful run are skipped and their outputs reused (force=True runs them all).
+    If a stage fails, nothing that depends on it is started, the running stages are
+    allowed to finish and PipelineError is raised.
+    on_event(stage name, status, seconds=None, error=None) is called from this thread as
+    stages change status: "running", "done", "up_to_date", "failed", "upstream_failed".
+    Returns {stage name: seconds} for the stages that ran.
+    """
+    def event(name, status, **info):
+        if on_event is not None:
+            on_event(name, status, **info)
+
+    order = topological_order(stages)
+    stages_by_name = {s.name: s for s in order}
+    pending = {s.name: s for s in order}
+    finished, failed, durations, cached = set(), {}, {}, []
+    store = FingerprintStore(state_path)
+    fingerprints = {}
+    started = time.time()
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers or len(order), mp_context=context) as pool:
+        running = {}
+        while pending or running:
+            for name, s in list(pending.items()):
+                if any(d in failed for d in s.deps):
+                    log(f"Skipping {name}: upstream stage failed")
+                    failed[name] = "upstream failed"
+                    del pending[name]
+                    event(name, "upstream_failed")
+                elif all(d in finished for d in s.deps):
+                    del pending[name]
+                    fingerprints[name] = _fingerprint(store, s)
+                    if not force and store.is_fresh(s, fingerprints[name]):
+                        log(f"Up to date: {name} (inputs unchanged, reusing its outputs)")
+                        finished.add(name)
+                        cached.append(name)
+                        event(name, "up_to_date")
+                        continue
+                    log(f"Starting {name}")
+                    running[pool.submit(_run_stage, s.target)] = name
+                    event(name, "running")
+
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    start, end = future.result()
+                except BaseException as e:
+                    failed[name] = repr(e)
+                    log(f"FAILED {name}: {e!r}")
+                    event(name, "failed", error=repr(e))
+                    continue
+                durations[name] = end - start
+                finished.add(name)
+                store.record(stages_by_name[name], fingerprints[name])
+                log(f"Finished {name} in {durations[name]:.1f}s")
+                event(name, "done", seconds=durations[name])
+
+    wall = time.time() - started
+    for s in order:
+        if s.name in durations:
+            log(f"  {s.name:<24} {durations[s.name]:8.1f}s")
+    path, path_seconds = critical_path(order, durations)
+    path = [name for name in path if name in durations]
+    if cached:
+        log(f"Skipped (up to date): {', '.join(cached)}")
+    log(f"Wall time {wall:.1f}s, sum of stages {sum(durations.values()):.1f}s, "
+        f"critical path {path_seconds:.1f}s: {' -> '.join(path)}")
+
+    if failed:
+        raise PipelineError("Failed stages: " + ", ".join(f"{n} ({why})" for n, why in failed.items()))
+    return durations
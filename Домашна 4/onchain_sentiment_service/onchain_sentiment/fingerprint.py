@@ -0,0 +1,155 @@
+import os
+import ast
+import glob
+import json
+import hashlib
+import importlib
+import importlib.util
+from datetime import datetime
+
+# Fingerprints of the inputs each stage last ran on, keyed by stage name
+# (relative to the service directory, like every path the stages use)
+STATE_PATH = "pipeline_state.json"
+HASH_CHUNK = 1 << 20
+
+
+def expand(patterns):
+    """Paths and glob patterns → sorted list of existing files."""
+    files = set()
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            files.update(p for p in glob.glob(pattern) if os.path.isfile(p))
+        elif os.path.isfile(pattern):
+            files.add(pattern)
+    return sorted(files)
+
+
+def outputs_present(patterns):
+    """Every declared output exists (a glob has to match at least one file)."""
+    return all(expand([pattern]) for pattern in patterns)
+
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def file_entry(path, previous=None):
+    """
+    size / mtime / sha256 of a file. The hash is only recomputed when size or mtime moved,
+    and it is what gets compared: a stage that rewrites identical bytes changes nothing downstream.
+    """
+    st = os.stat(path)
+    if previous and previous.get("size") == st.st_size and previous.get("mtime_ns") == st.st_mtime_ns:
+        return previous
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256_file(path)}
+
+
+def _source_of(module_name):
+    try:
+        spec = importlib.util.find_spec(module_name)
+    except (ImportError, ValueError):
+        return None
+    if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+        return None
+    return spec.origin
+
+
+def _imported_modules(module_name, path):
+    """Absolute names of the modules `path` imports (the module itself is `module_name`)."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    is_package = os.path.basename(path) == "__init__.py"
+    package = module_name if is_package else module_name.rpartition(".")[0]
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                base = importlib.util.resolve_name("." * node.level + base, package)
+            names.append(base)
+            # "from . import x" / "from .utils import x": x may be a module as well
+            names.extend(f"{base}.{alias.name}" for alias in node.names)
+    return names
+
+
+def module_files(target):
+    """
+    Source files of a "package.module:function" target and of every module of the same
+    top-level package it imports, directly or through other such modules (helpers like
+    utils/typed_csv.py), so editing any of them invalidates the stage. Third-party and
+    standard-library imports are not followed.
+    """
+    root_module = target.split(":")[0]
+    top = root_module.split(".")[0]
+    files, seen, todo = [], set(), [root_module]
+    while todo:
+        name = todo.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        path = _source_of(name)
+        if path is None:
+            continue
+        files.append(path)
+        todo.extend(n for n in _imported_modules(name, path) if n.split(".")[0] == top and n not in seen)
+    return sorted(set(files))
+
+
+def call_target(target):
+    module_name, func_name = target.split(":")
+    return getattr(importlib.import_module(module_name), func_name)()
+
+
+class FingerprintStore:
+    """Per-stage input fingerprints, persisted as JSON after every stage that succeeds."""
+
+    def __init__(self, path=STATE_PATH):
+        self.path = path
+        self.stages = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.stages = json.load(f)
+
+    def compute(self, stage):
+        """
+        Fingerprint of what `stage` would run on: its input files, its source file and those of
+        the package modules it imports (module_files) and, if it declares one, the value its
+        `state` target returns (e.g. rows it reads from the DB).
+        None when the stage declares no inputs, i.e. it has to run every time.
+        """
+        if not stage.inputs and not stage.state:
+            return None
+        previous = self.stages.get(stage.name, {}).get("files", {})
+        paths = expand(stage.inputs)
+        paths.extend(os.path.relpath(source) for source in module_files(stage.target))
+        files = {p: file_entry(p, previous.get(p)) for p in paths}
+        extra = call_target(stage.state) if stage.state else None
+
+        h = hashlib.sha256()
+        for p in sorted(files):
+            h.update(f"{p}\0{files[p]['sha256']}\n".encode())
+        h.update(json.dumps(extra, sort_keys=True, default=str).encode())
+        return {"digest": h.hexdigest(), "files": files}
+
+    def is_fresh(self, stage, fingerprint):
+        """Inputs unchanged since the last successful run and the outputs are still on disk."""
+        if fingerprint is None:
+            return False
+        last = self.stages.get(stage.name)
+        return (last is not None and last.get("digest") == fingerprint["digest"]
+                and outputs_present(stage.outputs))
+
+    def record(self, stage, fingerprint):
+        if fingerprint is None:
+            return
+        self.stages[stage.name] = dict(fingerprint, finished_at=datetime.now().isoformat(timespec="seconds"))
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.stages, f, indent=2)
+        os.replace(tmp, self.path)
@@ -0,0 +1,125 @@
+import time
+import uuid
+import threading
+import traceback
+from datetime import datetime
+
+from .pipeline import STAGES, run_pipeline
+
+# How many finished jobs stay queryable
+KEEP_FINISHED = 20
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class Job:
+    """One pipeline run and the status of each of its stages."""
+
+    def __init__(self, force=False):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.force = force
+        self.status = "running"
+        self.created_at = _now()
+        self.finished_at = None
+        self.start = time.monotonic()
+        self.elapsed = None
+        self.error = None
+        self.stages = {s.name: {"status": "pending", "seconds": None} for s in STAGES}
+
+    def on_event(self, name, status, seconds=None, error=None):
+        stage = self.stages.setdefault(name, {"status": "pending", "seconds": None})
+        stage["status"] = status
+        if seconds is not None:
+            stage["seconds"] = round(seconds, 1)
+        if error is not None:
+            stage["error"] = error
+
+    def finish(self, error=None):
+        self.elapsed = time.monotonic() - self.start
+        self.finished_at = _now()
+        self.status = "failed" if error else "succeeded"
+        self.error = error
+
+    def snapshot(self):
+        counts = {}
+        for stage in self.stages.values():
+            counts[stage["status"]] = counts.get(stage["status"], 0) + 1
+        elapsed = self.elapsed if self.elapsed is not None else time.monotonic() - self.start
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "force": self.force,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round(elapsed, 1),
+            "current_stages": [name for name, s in self.stages.items() if s["status"] == "running"],
+            "progress": {
+                "total": len(self.stages),
+                "finished": sum(counts.get(k, 0) for k in ("done", "up_to_date", "failed", "upstream_failed")),
+                **counts,
+            },
+            "stages": {name: dict(s) for name, s in self.stages.items()},
+            "error": self.error,
+        }
+
+
+class JobRegistry:
+    """
+    Single-flight pipeline runs: while a job is running, submit() hands back that job
+    instead of starting another one, so repeated triggers never overlap on the same
+    CSVs and tables. Jobs live in this process (the service runs as one process).
+    """
+
+    def __init__(self, keep=KEEP_FINISHED):
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.current = None
+        self.keep = keep
+
+    def submit(self, force=False):
+        """Returns (job snapshot, True if this call started it)."""
+        with self.lock:
+            if self.current is not None:
+                return self.current.snapshot(), False
+            job = Job(force)
+            self.current = job
+            self.jobs[job.job_id] = job
+            self._prune()
+            thread = threading.Thread(target=self._run, args=(job,), daemon=True)
+            thread.start()
+            return job.snapshot(), True
+
+    def _run(self, job):
+        def on_event(name, status, **info):
+            with self.lock:
+                job.on_event(name, status, **info)
+
+        error = None
+        try:
+            run_pipeline(force=job.force, on_event=on_event)
+        except BaseException as e:
+            traceback.print_exc()
+            error = str(e) or repr(e)
+        with self.lock:
+            job.finish(error)
+            self.current = None
+
+    def _prune(self):
+        finished = [j for j in self.jobs.values() if j is not self.current]
+        for job in finished[:max(len(finished) - self.keep, 0)]:
+            del self.jobs[job.job_id]
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return job.snapshot() if job is not None else None
+
+    def latest(self):
+        with self.lock:
+            job = self.current or (list(self.jobs.values())[-1] if self.jobs else None)
+            return job.snapshot() if job is not None else None
+
+
+registry = JobRegistry()
@@ -1,18 +1,42 @@
-from .utils.create_tables import main as create_tables
-from .utils.onchain_metrics import main as onchain_metrics
-from .utils.sentiment1 import main as sentiment1
-from .utils.sentiment2 import main as sentiment2
-from .utils.nlp import main as nlp_main
-from .utils.onchain_merge import main as onchain_merge
-from .utils.onchain_sentiment_merge import main as sentiment_merge
+from .dag import Stage, run_dag
 
+UTILS = "onchain_sentiment.utils"
 
-def run_pipeline():
-    create_tables()
-    onchain_metrics()
-    sentiment1()
-    sentiment2()
-    nlp_main()
-    onchain_merge()
-    sentiment_merge()
+# The coinmetrics branch (onchain_metrics -> onchain_merge) and the news branch
+# (sentiment1 -> sentiment2 -> nlp) are independent until onchain_sentiment_merge,
+# so run_dag runs them side by side.
+# The downloads and create_tables declare no inputs and run every time; everything
+# after them is skipped while the files it reads hash the same as on its last run.
+STAGES = [
+    Stage("create_tables", f"{UTILS}.create_tables:main"),
+    Stage("onchain_metrics", f"{UTILS}.onchain_metrics:main",
+          outputs=["coinmetrics_processed/*_nvt.csv"]),
+    Stage("onchain_merge", f"{UTILS}.onchain_merge:main", deps=["onchain_metrics"],
+          inputs=["coinmetrics_processed/*.csv"],
+          outputs=["merged_data/master_onchain_merged.csv"]),
+    Stage("sentiment1", f"{UTILS}.sentiment1:main",
+          outputs=["cryptonews_raw/news_currencies_source_joinedResult.csv"]),
+    Stage("sentiment2", f"{UTILS}.sentiment2:main", deps=["sentiment1"],
+          inputs=["cryptonews_raw/news_currencies_source_joinedResult.csv"],
+          outputs=["cryptonews_raw/news_joined_clean_for_nlp.csv",
+                   "cryptonews_raw/news_expanded_by_coin.csv",
+                   "cryptonews_raw/news_expanded_filtered.csv"],
+          # queries MySQL from the scheduler each run; if the DB is down sentiment2 just runs
+          state=f"{UTILS}.sentiment2:load_target_symbols"),
+    Stage("nlp", f"{UTILS}.nlp:main", deps=["sentiment2", "create_tables"],
+          inputs=["cryptonews_raw/news_expanded_filtered.csv"],
+          outputs=["nlp/news_with_vader.csv", "nlp/daily_sentiment_per_coin.csv"]),
+    Stage("sentiment_merge", f"{UTILS}.onchain_sentiment_merge:main",
+          deps=["onchain_merge", "nlp", "create_tables"],
+          inputs=["merged_data/master_onchain_merged.csv", "nlp/daily_sentiment_per_coin.csv"],
+          outputs=["on_chain_sentiment_merge/onchain_with_sentiment.csv"]),
+]
+
+
+def run_pipeline(force=False, on_event=None):
+    """
+    force=True reruns every stage even if its inputs are unchanged (e.g. after the DB was reset);
+    on_event is passed to run_dag to follow the stages' progress.
+    """
+    run_dag(STAGES, force=force, on_event=on_event)
     return "Pipeline complete"
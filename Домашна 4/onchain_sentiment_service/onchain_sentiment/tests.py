@@ -1,3 +1,104 @@
-from django.test import TestCase
+import os
+import tempfile
+import threading
+from pathlib import Path
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from .utils.coinmetrics_download import make_session, fetch
+
+BODY = b"time,PriceUSD\n2024-01-01,42000.0\n"
+ETAG = '"v1"'
+# when the upstream files last changed; files the tests write are newer
+UPSTREAM_MTIME = 1_700_000_000
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for raw.githubusercontent.com: /etag.csv answers with an ETag,
+    /plain.csv with neither ETag nor Last-Modified (so only If-Modified-Since can match).
+    """
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        StandInHandler.requests.append((self.path, dict(self.headers)))
+        if self.path == "/etag.csv" and self.headers.get("If-None-Match") == ETAG:
+            return self._reply(304)
+        since = self.headers.get("If-Modified-Since")
+        if self.path == "/plain.csv" and since and parsedate_to_datetime(since).timestamp() >= UPSTREAM_MTIME:
+            return self._reply(304)
+        self._reply(200, BODY, {"ETag": ETAG} if self.path == "/etag.csv" else {})
+
+    def _reply(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class CoinmetricsFetchTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}/"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        StandInHandler.requests = []
+        self.dir = tempfile.TemporaryDirectory()
+        self.session = make_session(1)
+
+    def tearDown(self):
+        self.session.close()
+        self.dir.cleanup()
+
+    def sent_headers(self):
+        return StandInHandler.requests[-1][1]
+
+    def test_download_saves_body_and_validators(self):
+        path = Path(self.dir.name) / "etag.csv"
+        status, validators = fetch(self.session, self.base + "etag.csv", path)
+        self.assertEqual(status, "downloaded")
+        self.assertEqual(path.read_bytes(), BODY)
+        self.assertEqual(validators, {"etag": ETAG, "bytes": len(BODY)})
+        self.assertFalse(path.with_name("etag.csv.part").exists())
+
+    def test_unchanged_file_is_not_transferred_again(self):
+        path = Path(self.dir.name) / "etag.csv"
+        _, validators = fetch(self.session, self.base + "etag.csv", path)
+        status, kept = fetch(self.session, self.base + "etag.csv", path, validators)
+        self.assertEqual(status, "not_modified")
+        self.assertEqual(kept, validators)
+        self.assertEqual(self.sent_headers().get("If-None-Match"), ETAG)
+
+    def test_without_validators_the_file_mtime_is_sent(self):
+        path = Path(self.dir.name) / "plain.csv"
+        _, validators = fetch(self.session, self.base + "plain.csv", path)
+        # the server sent neither ETag nor Last-Modified: only the size was saved
+        self.assertEqual(set(validators), {"bytes"})
+        status, _ = fetch(self.session, self.base + "plain.csv", path, validators)
+        self.assertEqual(status, "not_modified")
+        self.assertEqual(self.sent_headers().get("If-Modified-Since"),
+                         formatdate(path.stat().st_mtime, usegmt=True))
+
+    def test_local_file_older_than_upstream_is_downloaded(self):
+        path = Path(self.dir.name) / "plain.csv"
+        path.write_bytes(b"stale")
+        os.utime(path, (UPSTREAM_MTIME - 86400, UPSTREAM_MTIME - 86400))
+        status, _ = fetch(self.session, self.base + "plain.csv", path, {"bytes": 5})
+        self.assertEqual(status, "downloaded")
+        self.assertEqual(path.read_bytes(), BODY)
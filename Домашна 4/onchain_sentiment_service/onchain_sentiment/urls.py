@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import onchain_sentiment_api
+from .views import onchain_sentiment_api, onchain_sentiment_job
 
 urlpatterns = [
     path("api/onchain-sentiment/", onchain_sentiment_api),
+    path("api/onchain-sentiment/jobs/<str:job_id>/", onchain_sentiment_job),
 ]
@@ -0,0 +1,101 @@
+import time
+import argparse
+import tracemalloc
+import multiprocessing
+import pandas as pd
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from .typed_csv import read_typed, SCHEMAS, pa
+
+# Run from the service directory:
+#   python -m onchain_sentiment.utils.benchmark_readers [--ohlcv <historical/<coin>.csv>]
+DEFAULT_FILES = {
+    "coinmetrics": Path("coinmetrics_processed") / "btc_nvt.csv",
+    "onchain_master": Path("merged_data") / "master_onchain_merged.csv",
+    "news": Path("cryptonews_raw") / "news_expanded_filtered.csv",
+    "daily_sentiment": Path("nlp") / "daily_sentiment_per_coin.csv",
+}
+
+
+def _read(path, schema, typed):
+    if typed:
+        return read_typed(path, schema)
+    # what the stages did before: untyped read, then parse the date columns
+    df = pd.read_csv(path)
+    for col, kind in SCHEMAS[schema][1].items():
+        if col in df.columns:
+            parsed = pd.to_datetime(df[col], errors="coerce")
+            df[col] = parsed.dt.date if kind == "date" else parsed
+    return df
+
+
+def _time_read(path, schema, typed):
+    start = time.perf_counter()
+    df = _read(path, schema, typed)
+    return time.perf_counter() - start, len(df), df.shape[1], int(df.memory_usage(deep=True).sum())
+
+
+def _peak_read(path, schema, typed):
+    """
+    Peak bytes of one read: Python/numpy allocations (tracemalloc) plus the Arrow
+    memory pool high-water mark. The two peaks need not coincide, so this is an upper bound.
+    """
+    tracemalloc.start()
+    _read(path, schema, typed)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow_peak = pa.default_memory_pool().max_memory() if pa is not None else 0
+    return peak + arrow_peak
+
+
+def _in_fresh_process(fn, *args):
+    # one process per measurement: no warm caches, and the Arrow pool's peak starts at zero
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def bench_file(schema, path, repeat):
+    rows = []
+    for typed, reader in ((False, "pd.read_csv"), (True, "read_typed")):
+        timings = [_in_fresh_process(_time_read, path, schema, typed) for _ in range(repeat)]
+        seconds, n_rows, n_cols, frame_bytes = min(timings)
+        peak = _in_fresh_process(_peak_read, path, schema, typed)
+        rows.append({
+            "file": schema,
+            "reader": reader,
+            "rows": n_rows,
+            "cols": n_cols,
+            "seconds": round(seconds, 3),
+            "peak_mb": round(peak / 2 ** 20, 1),
+            "frame_mb": round(frame_bytes / 2 ** 20, 1),
+        })
+    before, after = rows
+    after["speedup"] = round(before["seconds"] / max(after["seconds"], 1e-9), 2)
+    after["peak_saved"] = f"{1 - after['peak_mb'] / max(before['peak_mb'], 1e-9):.0%}"
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse time and peak memory: pd.read_csv vs typed readers")
+    parser.add_argument("--ohlcv", help="a historical/<coin_id>.csv from Dians-hw1 to include")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per reader (best is reported)")
+    args = parser.parse_args()
+
+    files = dict(DEFAULT_FILES)
+    if args.ohlcv:
+        files["ohlcv"] = Path(args.ohlcv)
+
+    rows = []
+    for schema, path in files.items():
+        if not path.exists():
+            print(f"Skipping {schema}: {path} not found")
+            continue
+        rows.extend(bench_file(schema, path, args.repeat))
+
+    print(f"\n=== CSV reader benchmark (engine: {'pyarrow' if pa is not None else 'pandas c'}) ===")
+    print(pd.DataFrame(rows).fillna("").to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import os
+import time
+import argparse
+import tempfile
+import pandas as pd
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from .nlp import INPUT_PATH
+from .typed_csv import read_typed
+from .vader_engine import score_texts, BATCH_SIZE
+
+# Run from the service directory:
+#   python -m onchain_sentiment.utils.benchmark_vader [--limit N] [--workers N]
+
+
+def load_texts(path, limit):
+    # distinct texts, as nlp.score_articles hands them to the engine
+    df = read_typed(path, "news", columns=["title", "description"])
+    texts = (df["title"].fillna("") + " " + df["description"].fillna("")).str.strip()
+    texts = texts.drop_duplicates()
+    return texts.head(limit) if limit else texts
+
+
+def bench_apply(texts):
+    # what nlp.py did before: one analyzer, Series.apply in this process
+    analyzer = SentimentIntensityAnalyzer()
+    start = time.perf_counter()
+    scores = texts.apply(lambda text: analyzer.polarity_scores(str(text))["compound"])
+    return time.perf_counter() - start, scores.tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VADER throughput: Series.apply vs the batched process-pool engine")
+    parser.add_argument("--input", default=str(INPUT_PATH))
+    parser.add_argument("--limit", type=int, default=0, help="score only the first N distinct texts")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    texts = load_texts(args.input, args.limit)
+    n = len(texts)
+    print(f"{n:,} distinct texts from {args.input}")
+
+    apply_seconds, expected = bench_apply(texts)
+    rows = [{"path": "Series.apply", "workers": 1, "seconds": apply_seconds}]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "vader_cache.sqlite")
+        for label in ("engine, empty cache", "engine, warm cache"):
+            scores, stats = score_texts(texts.tolist(), workers=args.workers,
+                                        batch_size=args.batch_size, cache_path=cache_path)
+            if scores != expected:
+                raise SystemExit(f"{label}: scores differ from Series.apply")
+            rows.append({"path": label, "workers": stats["workers"], "seconds": stats["seconds"]})
+
+    for row in rows:
+        row["texts_per_sec"] = round(n / max(row["seconds"], 1e-9))
+        row["speedup"] = round(apply_seconds / max(row["seconds"], 1e-9), 1)
+        row["seconds"] = round(row["seconds"], 2)
+
+    print("\n=== VADER scoring benchmark ===")
+    print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import requests
+from pathlib import Path
+from email.utils import formatdate
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tqdm import tqdm
+
+BASE_URL = "https://raw.githubusercontent.com/coinmetrics/data/master/csv/"
+DOWNLOAD_WORKERS = 8
+CHUNK_BYTES = 1 << 20
+TIMEOUT = (5, 60)  # connect, and between two chunks of the body
+# ETag / Last-Modified of every downloaded file, next to the files
+VALIDATORS_NAME = "validators.json"
+
+
+def make_session(workers=DOWNLOAD_WORKERS):
+    """One pooled session for all workers; connection errors and 429/5xx are retried with backoff."""
+    session = requests.Session()
+    retry = Retry(total=3, backoff_factor=1.0, status_forcelist=[429, 500, 502, 503, 504],
+                  allowed_methods=["GET"], respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def load_validators(download_dir):
+    path = Path(download_dir) / VALIDATORS_NAME
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_validators(download_dir, validators):
+    path = Path(download_dir) / VALIDATORS_NAME
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(validators, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def fetch(session, url, path, validators=None):
+    """
+    Conditional GET of `url` into `path`. A file already on disk is only transferred again
+    if the server says it changed (If-None-Match / If-Modified-Since, from the validators of
+    the last download, or the file's mtime if there are none). The body is streamed to a
+    .part file that replaces `path` once complete.
+    Returns (status, validators): "downloaded", "not_modified" or "missing" (any other status).
+    """
+    validators = validators or {}
+    headers = {}
+    if path.exists():
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+        elif not validators.get("etag"):
+            # nothing to revalidate with (e.g. only "bytes" was saved): fall back to the file's age
+            headers["If-Modified-Since"] = formatdate(path.stat().st_mtime, usegmt=True)
+
+    with session.get(url, headers=headers, timeout=TIMEOUT, stream=True) as response:
+        if response.status_code == 304:
+            return "not_modified", validators
+        if response.status_code != 200:
+            return "missing", validators
+        tmp = path.with_name(path.name + ".part")
+        size = 0
+        with open(tmp, "wb") as f:
+            for chunk in response.iter_content(CHUNK_BYTES):
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(tmp, path)
+        fresh = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified"),
+                 "bytes": size}
+        return "downloaded", {k: v for k, v in fresh.items() if v is not None}
+
+
+def download_all(symbols, download_dir, base_url=BASE_URL, workers=DOWNLOAD_WORKERS):
+    """
+    Bring download_dir/<symbol>.csv up to date for every symbol, `workers` at a time.
+    Returns {symbol: "downloaded" | "not_modified" | "missing" | "error"}.
+    """
+    download_dir = Path(download_dir)
+    download_dir.mkdir(exist_ok=True)
+    validators = load_validators(download_dir)
+    session = make_session(workers)
+    statuses = {}
+    start = time.perf_counter()
+
+    def one(symbol):
+        return fetch(session, f"{base_url}{symbol}.csv", download_dir / f"{symbol}.csv", validators.get(symbol))
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(one, symbol): symbol for symbol in symbols}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Downloading"):
+                symbol = futures[future]
+                try:
+                    statuses[symbol], found = future.result()
+                except Exception:
+                    statuses[symbol] = "error"
+                    continue
+                if found:
+                    validators[symbol] = found
+    finally:
+        save_validators(download_dir, validators)
+        session.close()
+
+    counts = {}
+    for status in statuses.values():
+        counts[status] = counts.get(status, 0) + 1
+    transferred = sum(validators[s].get("bytes", 0) for s, st in statuses.items() if st == "downloaded")
+    print(f"Checked {len(statuses)} files in {time.perf_counter() - start:.1f}s: "
+          + ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+          + f", {transferred / 2 ** 20:.1f} MB transferred")
+    return statuses
@@ -1,3 +1,4 @@
+import hashlib
 import mysql.connector
 
 DB_HOST = "localhost"
@@ -5,6 +6,45 @@ DB_USER = "root"
 DB_PASS = "Test123!"
 DB_NAME = "crypto_data"
 
+# news_test's natural key: MD5 over these fields joined with \x1f, NULL as "" and
+# news_datetime to the second. NEWS_HASH_SQL computes the same hash in MySQL (to backfill
+# tables created before the key existed), news_content_hash in Python (for new rows).
+NEWS_KEY_COLUMNS = ["symbol", "news_datetime", "title", "description", "url"]
+NEWS_HASH_SQL = "MD5(CONCAT_WS(CHAR(31 USING utf8mb4), {}))".format(
+    ", ".join(f"COALESCE({col}, '')" for col in NEWS_KEY_COLUMNS))
+
+
+def news_content_hash(symbol, news_datetime, title, description, url):
+    """news_datetime as "YYYY-mm-dd HH:MM:SS"; None for missing values."""
+    values = (symbol, news_datetime, title, description, url)
+    key = "\x1f".join("" if v is None else str(v) for v in values)
+    return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+def add_news_content_hash(cursor):
+    """Give a news_test created without content_hash the column, drop its duplicate rows, then add the unique key."""
+    cursor.execute("""
+    SELECT COUNT(*) FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'news_test' AND COLUMN_NAME = 'content_hash'
+    """)
+    if cursor.fetchone()[0]:
+        return
+    print("Adding content_hash to news_test (backfill, dropping duplicate rows)...")
+    cursor.execute("ALTER TABLE news_test ADD COLUMN content_hash CHAR(32), ADD INDEX idx_content_hash (content_hash)")
+    cursor.execute(f"UPDATE news_test SET content_hash = {NEWS_HASH_SQL}")
+    # keep the first copy of every row that earlier runs inserted again
+    cursor.execute("""
+    DELETE dup FROM news_test dup
+    JOIN news_test keep ON keep.content_hash = dup.content_hash AND keep.id < dup.id
+    """)
+    print(f"Removed {cursor.rowcount} duplicate news rows")
+    cursor.execute("""
+    ALTER TABLE news_test
+        MODIFY content_hash CHAR(32) NOT NULL,
+        DROP INDEX idx_content_hash,
+        ADD UNIQUE KEY uq_news_content (content_hash)
+    """)
+
 
 def create_tables():
     conn = mysql.connector.connect(
@@ -30,9 +70,12 @@ def create_tables():
         vader_score DOUBLE,
         currencies TEXT,
         sourceId VARCHAR(50),
-        INDEX idx_symbol_date (symbol, news_datetime)
+        content_hash CHAR(32) NOT NULL,
+        INDEX idx_symbol_date (symbol, news_datetime),
+        UNIQUE KEY uq_news_content (content_hash)
     )
     """)
+    add_news_content_hash(cursor)
 
     # Aggregated daily sentiment per symbol (derived from news data)
     cursor.execute("""
@@ -1,8 +1,12 @@
+import time
 import pandas as pd
 from pathlib import Path
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 import mysql.connector
 
+from .typed_csv import read_typed
+from .vader_engine import score_texts
+from .create_tables import news_content_hash
+
 DB_HOST = "localhost"
 DB_USER = "root"
 DB_PASS = "Test123!"
@@ -14,9 +18,134 @@ NEWS_DIR.mkdir(exist_ok=True)
 
 INPUT_PATH = RAW_DIR / "news_expanded_filtered.csv"
 
+# Rows per executemany; each batch is committed as one transaction
+DB_BATCH_SIZE = 2000
+
+NEWS_SQL = """
+INSERT INTO news_test (
+    symbol, title, description, text, url,
+    source_domain, news_datetime, vader_score,
+    currencies, sourceId, content_hash
+)
+VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+ON DUPLICATE KEY UPDATE
+    vader_score = VALUES(vader_score),
+    text = VALUES(text),
+    source_domain = VALUES(source_domain),
+    currencies = VALUES(currencies),
+    sourceId = VALUES(sourceId)
+"""
+
+DAILY_SQL = """
+INSERT INTO daily_sentiment_test (symbol, date, sentiment_score)
+VALUES (%s,%s,%s)
+ON DUPLICATE KEY UPDATE sentiment_score = VALUES(sentiment_score)
+"""
+
+
+def score_articles(texts):
+    """
+    Score each distinct text once and map the scores back onto every row. After the
+    currency expansion an article appears once per symbol it mentions, and the score
+    only depends on the text (title + description), so the copies share one score.
+    Returns (scores aligned with `texts`, stats).
+    """
+    unique_texts = texts.drop_duplicates()
+    unique_scores, engine = score_texts(unique_texts.tolist())
+
+    scores = texts.map(pd.Series(unique_scores, index=unique_texts.values))
+    per_text = engine["seconds"] / max(len(unique_texts), 1)
+    stats = dict(
+        engine,
+        rows=len(texts),
+        unique=len(unique_texts),
+        dedup_ratio=len(texts) / max(len(unique_texts), 1),
+        # what scoring every row would have cost at the measured per-text rate
+        seconds_saved=per_text * (len(texts) - len(unique_texts)),
+    )
+    return scores, stats
+
+
+def _nullable(series):
+    return series.astype(object).where(series.notna(), None)
+
+
+def news_rows(df):
+    """{content hash: NEWS_SQL parameters}, one entry per distinct row (NaN / NaT → NULL)."""
+    when = df["newsDatetime"]
+    key_time = _nullable(when.dt.strftime("%Y-%m-%d %H:%M:%S"))
+    db_time = [None if pd.isna(t) else t.to_pydatetime() for t in when]
+    cols = {c: _nullable(df[c]) for c in ["symbol", "title", "description", "text", "url",
+                                           "sourceDomain", "vader_score", "currencies", "sourceId"]}
+    rows = {}
+    for i, (symbol, title, description, url) in enumerate(
+            zip(cols["symbol"], cols["title"], cols["description"], cols["url"])):
+        h = news_content_hash(symbol, key_time.iat[i], title, description, url)
+        if h not in rows:
+            rows[h] = (symbol, title, description, cols["text"].iat[i], url,
+                       cols["sourceDomain"].iat[i], db_time[i], cols["vader_score"].iat[i],
+                       cols["currencies"].iat[i], cols["sourceId"].iat[i], h)
+    return rows
+
+
+def write_batches(conn, sql, rows, batch_size=DB_BATCH_SIZE):
+    """executemany in batches of batch_size, one commit per batch."""
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _stored(conn, sql):
+    cursor = conn.cursor()
+    cursor.execute(sql)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def insert_news_and_sentiment(df_news, df_daily):
+    """
+    Upsert the scored news (keyed by content_hash) and the daily averages (keyed by
+    symbol + date). Rows already stored with the same score are not sent again, so a
+    rerun over the same news writes next to nothing and never duplicates a row.
+    """
+    conn = mysql.connector.connect(
+        host=DB_HOST,
+        user=DB_USER,
+        password=DB_PASS,
+        database=DB_NAME,
+    )
+    try:
+        start = time.perf_counter()
+        stored = dict(_stored(conn, "SELECT content_hash, vader_score FROM news_test"))
+        news = news_rows(df_news)
+        changed = [row for h, row in news.items() if stored.get(h) != row[7]]
+        write_batches(conn, NEWS_SQL, changed)
+        print(f"News: {len(changed):,} new or rescored rows written, "
+              f"{len(news) - len(changed):,} unchanged ({time.perf_counter() - start:.1f}s)")
+
+        start = time.perf_counter()
+        stored = {(s, d): score for s, d, score in
+                  _stored(conn, "SELECT symbol, date, sentiment_score FROM daily_sentiment_test")}
+        daily = [(r.symbol, r.date, float(r.sentiment_score)) for r in df_daily.itertuples(index=False)]
+        changed = [row for row in daily if stored.get(row[:2]) != row[2]]
+        write_batches(conn, DAILY_SQL, changed)
+        print(f"Daily sentiment: {len(changed):,} rows written, "
+              f"{len(daily) - len(changed):,} unchanged ({time.perf_counter() - start:.1f}s)")
+    finally:
+        conn.close()
+    print("News & daily sentiment inserted into DB")
+
 
 def main():
-    df = pd.read_csv(INPUT_PATH)
+    df = read_typed(INPUT_PATH, "news")
     print("Loaded rows:", len(df))
     print("Columns:", df.columns.tolist())
 
@@ -24,13 +153,13 @@ def main():
     df["description"] = df["description"].fillna("")
     df["text"] = (df["title"] + " " + df["description"]).str.strip()
 
-    analyzer = SentimentIntensityAnalyzer()
-
-    def compute_vader(text: str) -> float:
-        return analyzer.polarity_scores(str(text))["compound"]
-
     print("Computing VADER sentiment...")
-    df["vader_score"] = df["text"].apply(compute_vader)
+    df["vader_score"], stats = score_articles(df["text"])
+    print(f"Scored {stats['unique']:,} unique articles for {stats['rows']:,} rows "
+          f"(dedup ratio {stats['dedup_ratio']:.2f}x) in {stats['seconds']:.1f}s, "
+          f"~{stats['seconds_saved']:.1f}s saved")
+    print(f"  {stats['cached']:,} from the score cache, {stats['scored']:,} scored on "
+          f"{stats['workers']} worker(s), {stats['texts_per_second']:,.0f} texts/s")
 
     df["newsDatetime"] = pd.to_datetime(df["newsDatetime"], errors="coerce").dt.tz_localize(None)
     df["date"] = df["newsDatetime"].dt.date
@@ -69,56 +198,6 @@ def main():
     print("\nDaily sentiment preview:")
     print(daily.head())
 
-    def insert_news_and_sentiment(df_news, df_daily):
-        conn = mysql.connector.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASS,
-            database=DB_NAME,
-            autocommit=True
-        )
-        cursor = conn.cursor()
-
-        news_sql = """
-        INSERT INTO news_test (
-            symbol, title, description, text, url,
-            source_domain, news_datetime, vader_score,
-            currencies, sourceId
-        )
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """
-
-        for row in df_news.itertuples(index=False):
-            cursor.execute(news_sql, (
-                row.symbol,
-                row.title,
-                row.description,
-                row.text,
-                row.url,
-                row.sourceDomain,
-                row.newsDatetime,
-                row.vader_score,
-                row.currencies,
-                row.sourceId
-            ))
-
-        daily_sql = """
-        INSERT INTO daily_sentiment_test (symbol, date, sentiment_score)
-        VALUES (%s,%s,%s)
-        ON DUPLICATE KEY UPDATE sentiment_score=VALUES(sentiment_score)
-        """
-
-        for row in df_daily.itertuples(index=False):
-            cursor.execute(daily_sql, (
-                row.symbol,
-                row.date,
-                row.sentiment_score
-            ))
-
-        cursor.close()
-        conn.close()
-        print("News & daily sentiment inserted into DB")
-
     insert_news_and_sentiment(df, daily)
 
 
@@ -2,6 +2,8 @@ import pandas as pd
 from pathlib import Path
 from tqdm import tqdm
 
+from .typed_csv import read_typed
+
 PROCESSED_DIR = Path("coinmetrics_processed")
 OUTPUT_DIR = Path("merged_data")
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -25,7 +27,9 @@ def main():
         symbol = csv_path.stem.split('_')[0].upper()
 
         try:
-            df = pd.read_csv(csv_path)
+            # time stays a string here: it is written straight back out, as are
+            # columns the schema doesn't list (keep_unknown)
+            df = read_typed(csv_path, "coinmetrics", parse_dates=False, keep_unknown=True)
             df['symbol'] = symbol
             master_df = pd.concat([master_df, df], ignore_index=True)
             total_rows += len(df)
@@ -1,10 +1,11 @@
 import pandas as pd
-import requests
 import mysql.connector
 import numpy as np
 from pathlib import Path
 from tqdm import tqdm
 
+from .coinmetrics_download import download_all
+
 DB_HOST = "localhost"
 DB_PORT = 3306
 DB_USER = "root"
@@ -60,38 +61,32 @@ def main():
     coin_ids = coins_df['coin_id'].tolist()
 
     print(f"Found {len(coin_symbols)} coins in database")
-    BASE_URL = "https://raw.githubusercontent.com/coinmetrics/data/master/csv/"
 
-    successful_downloads = 0
+    # conditional GETs: files unchanged upstream since the last run are not transferred again
+    print("Downloading coinmetrics CSVs...")
+    downloads = download_all(coin_symbols, DOWNLOAD_DIR)
+    successful_downloads = sum(1 for status in downloads.values() if status == "downloaded")
+
     successful_processed = 0
     failed_downloads = []
     results = []
 
-    print("Downloading + Computing NVT Ratio...")
+    print("Computing NVT Ratio...")
     for symbol, coin_id in tqdm(zip(coin_symbols, coin_ids), total=len(coin_symbols)):
-        csv_url = f"{BASE_URL}{symbol}.csv"
         raw_path = DOWNLOAD_DIR / f"{symbol}.csv"
         processed_path = PROCESSED_DIR / f"{symbol}_nvt.csv"
+        download = downloads.get(symbol)
 
-        if processed_path.exists():
+        # only a new download changes the NVT file; otherwise keep the one on disk
+        if processed_path.exists() and download != "downloaded":
             successful_processed += 1
             results.append({'symbol': symbol, 'coin_id': coin_id, 'status': 'processed'})
             continue
 
         if not raw_path.exists():
-            try:
-                response = requests.get(csv_url, timeout=10)
-                if response.status_code != 200:
-                    failed_downloads.append({'symbol': symbol, 'coin_id': coin_id})
-                    results.append({'symbol': symbol, 'coin_id': coin_id, 'status': 'missing'})
-                    continue
-                with open(raw_path, 'wb') as f:
-                    f.write(response.content)
-                successful_downloads += 1
-            except Exception:
-                failed_downloads.append({'symbol': symbol, 'coin_id': coin_id})
-                results.append({'symbol': symbol, 'coin_id': coin_id, 'status': 'error'})
-                continue
+            failed_downloads.append({'symbol': symbol, 'coin_id': coin_id})
+            results.append({'symbol': symbol, 'coin_id': coin_id, 'status': download})
+            continue
 
         try:
             df_raw = pd.read_csv(raw_path)
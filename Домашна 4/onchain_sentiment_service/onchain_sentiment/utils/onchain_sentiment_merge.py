@@ -3,6 +3,8 @@ from pathlib import Path
 import numpy as np
 import mysql.connector
 
+from .typed_csv import read_typed
+
 ONCHAIN_PATH = Path("merged_data") / "master_onchain_merged.csv"
 SENT_PATH = Path("nlp") / "daily_sentiment_per_coin.csv"
 
@@ -17,17 +19,15 @@ DB_NAME = "crypto_data"
 
 
 def main():
-    onchain = pd.read_csv(ONCHAIN_PATH)
-    sent = pd.read_csv(SENT_PATH)
+    onchain = read_typed(ONCHAIN_PATH, "onchain_master", keep_unknown=True)
+    sent = read_typed(SENT_PATH, "daily_sentiment")
 
     print("On-chain rows:", len(onchain))
     print("Sentiment rows:", len(sent))
 
-    onchain["time"] = pd.to_datetime(onchain["time"], errors="coerce")
     onchain["date"] = onchain["time"].dt.date
     onchain["symbol"] = onchain["symbol"].str.upper()
 
-    sent["date"] = pd.to_datetime(sent["date"]).dt.date
     sent["symbol"] = sent["symbol"].str.upper()
 
     merged = onchain.merge(sent, on=["symbol", "date"], how="left")
@@ -6,75 +6,98 @@ NEWS_DIR = Path("cryptonews_raw")
 NEWS_DIR.mkdir(exist_ok=True)
 
 CSV_PATH = NEWS_DIR / "news_currencies_source_joinedResult.csv"
-
-
-def main():
-    df = pd.read_csv(CSV_PATH)
-    print("Original columns:", df.columns.tolist())
-    print("Rows:", len(df))
-
-    sentiment_cols = [
-        "negative",
-        "positive",
-        "important",
-        "liked",
-        "disliked",
-        "lol",
-        "toxic",
-        "saved",
-        "comments",
-    ]
-
-    df_clean = df.drop(columns=sentiment_cols, errors="ignore")
-
-    OUT_CLEAN = NEWS_DIR / "news_joined_clean_for_nlp.csv"
-    df_clean.to_csv(OUT_CLEAN, index=False)
-    print("\nClean NLP input saved to:", OUT_CLEAN.resolve())
-    print("Kept columns:", df_clean.columns.tolist())
-
-    print("\nExpanding currencies -> one row per (news, coin)...")
-    rows = []
-    for _, row in df_clean.iterrows():
-        cur = str(row.get("currencies", ""))
-        if not cur or cur.lower() == "nan":
-            continue
-        for code in cur.split(";"):
-            code = code.strip().upper()
-            if not code:
-                continue
-            r = row.copy()
-            r["symbol"] = code
-            rows.append(r)
-
-    expanded = pd.DataFrame(rows)
-    EXPANDED_PATH = NEWS_DIR / "news_expanded_by_coin.csv"
-    expanded.to_csv(EXPANDED_PATH, index=False)
-    print(f"Expanded rows: {len(expanded)}")
-    print(f"Coins covered in news: {expanded['symbol'].nunique()}")
-    print("Saved expanded file to:", EXPANDED_PATH.resolve())
-
-    print("\nLoading target coins from MySQL (all symbols)...")
+OUT_CLEAN = NEWS_DIR / "news_joined_clean_for_nlp.csv"
+EXPANDED_PATH = NEWS_DIR / "news_expanded_by_coin.csv"
+FILTERED_PATH = NEWS_DIR / "news_expanded_filtered.csv"
+
+# News rows read per chunk; memory stays flat however large the dataset gets
+CHUNK_ROWS = 50_000
+# Seconds to wait for MySQL before giving up
+CONNECT_TIMEOUT = 5
+
+SENTIMENT_COLS = [
+    "negative",
+    "positive",
+    "important",
+    "liked",
+    "disliked",
+    "lol",
+    "toxic",
+    "saved",
+    "comments",
+]
+
+
+def load_target_symbols():
+    """
+    Upper-cased symbols of the coins table (sorted). The pipeline also calls this in the
+    scheduler to fingerprint sentiment2, hence the short connect timeout: an unreachable DB
+    fails fast and the stage simply runs.
+    """
     conn = mysql.connector.connect(
         host="localhost",
         user="root",
         password="Test123!",
         database="crypto_data",
+        connection_timeout=CONNECT_TIMEOUT,
     )
     coins_df = pd.read_sql("SELECT symbol FROM coins", conn)
     conn.close()
+    return sorted(set(coins_df["symbol"].str.upper()))
 
-    target = set(coins_df["symbol"].str.upper())
+
+def expand_currencies(df):
+    """One row per (news, coin): split "currencies" on ';', one row per non-empty code in "symbol"."""
+    codes = df["currencies"].str.split(";")
+    expanded = df.assign(symbol=codes).explode("symbol", ignore_index=True)
+    expanded["symbol"] = expanded["symbol"].str.strip().str.upper()
+    return expanded[expanded["symbol"].notna() & (expanded["symbol"] != "")]
+
+
+def main():
+    print("\nLoading target coins from MySQL (all symbols)...")
+    target = set(load_target_symbols())
     print(f"Target coins from DB (unique symbols): {len(target)}")
 
-    expanded = pd.read_csv(EXPANDED_PATH)
-    expanded_filtered = expanded[expanded["symbol"].isin(target)].copy()
+    # everything stays a string: the files are passed through, not computed on,
+    # and every chunk then writes a column the same way (no int in one, float in the next)
+    reader = pd.read_csv(CSV_PATH, dtype=str, chunksize=CHUNK_ROWS)
 
-    FILTERED_PATH = NEWS_DIR / "news_expanded_filtered.csv"
-    expanded_filtered.to_csv(FILTERED_PATH, index=False)
-    print(f"Filtered rows: {len(expanded_filtered)} saved to {FILTERED_PATH.resolve()}")
+    print("\nExpanding currencies -> one row per (news, coin)...")
+    rows = expanded_rows = filtered_rows = 0
+    covered = set()
+    preview = None
+    for i, chunk in enumerate(reader):
+        if i == 0:
+            print("Original columns:", chunk.columns.tolist())
+            print("Kept columns:", [c for c in chunk.columns if c not in SENTIMENT_COLS])
+        write = {"index": False, "mode": "w" if i == 0 else "a", "header": i == 0}
+
+        df_clean = chunk.drop(columns=SENTIMENT_COLS, errors="ignore")
+        df_clean.to_csv(OUT_CLEAN, **write)
+
+        expanded = expand_currencies(df_clean)
+        expanded.to_csv(EXPANDED_PATH, **write)
+
+        expanded_filtered = expanded[expanded["symbol"].isin(target)]
+        expanded_filtered.to_csv(FILTERED_PATH, **write)
+
+        rows += len(chunk)
+        expanded_rows += len(expanded)
+        filtered_rows += len(expanded_filtered)
+        covered.update(expanded["symbol"].unique())
+        if preview is None and not expanded_filtered.empty:
+            preview = expanded_filtered[["newsDatetime", "symbol", "title"]].head()
+
+    print("Rows:", rows)
+    print("\nClean NLP input saved to:", OUT_CLEAN.resolve())
+    print(f"Expanded rows: {expanded_rows}")
+    print(f"Coins covered in news: {len(covered)}")
+    print("Saved expanded file to:", EXPANDED_PATH.resolve())
+    print(f"Filtered rows: {filtered_rows} saved to {FILTERED_PATH.resolve()}")
 
     print("\nPreview:")
-    print(expanded_filtered[["newsDatetime", "symbol", "title"]].head())
+    print(preview)
 
 
 if __name__ == "__main__":
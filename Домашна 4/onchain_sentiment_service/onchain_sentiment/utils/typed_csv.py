@@ -0,0 +1,155 @@
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+except ImportError:
+    pa = None
+
+# =======================
+# SCHEMAS
+# =======================
+# Only the listed columns are read, unless read_typed(keep_unknown=True) is asked to pass the
+# others through. Every column below is written back to a CSV or a DOUBLE column, so floats stay
+# float64: a float32 round trip would change the stored values. FLOAT32 is for columns that are
+# only ever read (none at the moment). Counts (BIGINT in the DB) are INT64, pandas' nullable
+# "Int64", so they are written back as "123", not "123.0"; they are parsed as floats first,
+# and a column that turns out to hold fractions stays float64.
+# Date columns are read as strings and parsed by pandas, so odd values become NaT
+# instead of failing the whole file.
+FLOAT64, FLOAT32, INT64, STRING = "float64", "float32", "Int64", "string"
+
+OHLCV = {
+    "date": STRING,
+    "open": FLOAT64,
+    "high": FLOAT64,
+    "low": FLOAT64,
+    "close": FLOAT64,
+    "volume": FLOAT64,
+}
+
+# coinmetrics_processed/<symbol>_nvt.csv → the columns onchain_metrics_test stores
+COINMETRICS = {
+    "time": STRING,
+    "CapMrktEstUSD": FLOAT64,
+    "ReferenceRate": FLOAT64,
+    "ReferenceRateBTC": FLOAT64,
+    "ReferenceRateETH": FLOAT64,
+    "ReferenceRateEUR": FLOAT64,
+    "ReferenceRateUSD": FLOAT64,
+    "volume_reported_spot_usd_1d": FLOAT64,
+    "NVT_Ratio": FLOAT64,
+    "AdrActCnt": INT64,
+    "AdrBalCnt": INT64,
+    "AssetCompletionTime": FLOAT64,
+    "AssetEODCompletionTime": FLOAT64,
+    "CapMVRVCur": FLOAT64,
+    "CapMrktCurUSD": FLOAT64,
+    "IssTotNtv": FLOAT64,
+    "IssTotUSD": FLOAT64,
+    "PriceBTC": FLOAT64,
+    "PriceUSD": FLOAT64,
+    "ROI1yr": FLOAT64,
+    "ROI30d": FLOAT64,
+    "SplyCur": FLOAT64,
+    "TxCnt": INT64,
+    "TxTfrCnt": INT64,
+    "BlkCnt": INT64,
+    "FeeTotNtv": FLOAT64,
+    "HashRate": FLOAT64,
+    "SplyExpFut10yr": FLOAT64,
+    "FlowInExNtv": FLOAT64,
+    "FlowInExUSD": FLOAT64,
+    "FlowOutExNtv": FLOAT64,
+    "FlowOutExUSD": FLOAT64,
+    "SplyExNtv": FLOAT64,
+    "SplyExUSD": FLOAT64,
+}
+
+# merged_data/master_onchain_merged.csv
+ONCHAIN_MASTER = {"symbol": STRING, **COINMETRICS}
+
+# cryptonews_raw/news_expanded_filtered.csv → what nlp.py scores and stores
+NEWS = {
+    "symbol": STRING,
+    "title": STRING,
+    "description": STRING,
+    "newsDatetime": STRING,
+    "url": STRING,
+    "sourceUrl": STRING,
+    "sourceDomain": STRING,
+    "currencies": STRING,
+    "sourceId": STRING,
+}
+
+# nlp/daily_sentiment_per_coin.csv
+DAILY_SENTIMENT = {
+    "symbol": STRING,
+    "date": STRING,
+    "sentiment_score": FLOAT64,
+}
+
+# schema name → (column types, {date column: "date" | "datetime"})
+SCHEMAS = {
+    "ohlcv": (OHLCV, {"date": "date"}),
+    "coinmetrics": (COINMETRICS, {"time": "datetime"}),
+    "onchain_master": (ONCHAIN_MASTER, {"time": "datetime"}),
+    "news": (NEWS, {}),
+    "daily_sentiment": (DAILY_SENTIMENT, {"date": "date"}),
+}
+
+
+def header(path):
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def _arrow_type(kind):
+    return {FLOAT64: pa.float64(), FLOAT32: pa.float32(), INT64: pa.float64(), STRING: pa.string()}[kind]
+
+
+def _read_arrow(path, types):
+    convert = pacsv.ConvertOptions(
+        column_types={col: _arrow_type(kind) for col, kind in types.items()},
+        include_columns=list(types),
+        strings_can_be_null=True,  # empty cells → NaN/None, as pd.read_csv does
+    )
+    table = pacsv.read_csv(path, convert_options=convert)
+    # hand each column's buffers back as soon as it is converted, so the Arrow copy
+    # and the DataFrame are never both fully in memory
+    return table.to_pandas(self_destruct=True, split_blocks=True)
+
+
+def _read_pandas(path, types):
+    dtype = {col: {STRING: str, INT64: FLOAT64}.get(kind, kind) for col, kind in types.items()}
+    return pd.read_csv(path, usecols=list(types), dtype=dtype)
+
+
+def read_typed(path, schema, columns=None, parse_dates=True, keep_unknown=False):
+    """
+    Read a pipeline CSV with the column types of `schema` (a key of SCHEMAS).
+    Schema columns the file doesn't have are skipped (coinmetrics files differ per asset).
+    Columns outside the schema are skipped too, unless keep_unknown=True: then every column
+    of the file is read, in file order, the unknown ones as text so that they are written
+    back unchanged (keep_unknown has no effect when `columns` is given).
+    Uses pyarrow's CSV reader when pyarrow is installed, pandas' C parser otherwise.
+    """
+    schema_types, dates = SCHEMAS[schema]
+    file_columns = header(path)
+    if keep_unknown and columns is None:
+        types = {col: schema_types.get(col, STRING) for col in file_columns}
+    else:
+        present = set(file_columns)
+        types = {col: schema_types[col] for col in (columns or schema_types) if col in present}
+
+    df = _read_arrow(path, types) if pa is not None else _read_pandas(path, types)
+    for col, kind in types.items():
+        if kind == INT64 and (df[col].dropna() % 1 == 0).all():
+            df[col] = df[col].astype(INT64)
+
+    if parse_dates:
+        for col, kind in dates.items():
+            if col not in df.columns:
+                continue
+            parsed = pd.to_datetime(df[col], errors="coerce")
+            df[col] = parsed.dt.date if kind == "date" else parsed
+    return df
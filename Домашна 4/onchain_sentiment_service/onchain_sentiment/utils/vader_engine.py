@@ -0,0 +1,128 @@
+import os
+import time
+import sqlite3
+import hashlib
+import multiprocessing
+from importlib.metadata import version, PackageNotFoundError
+from concurrent.futures import ProcessPoolExecutor
+
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+# VADER compound scores by content hash, so a rerun only scores texts it has not seen before
+CACHE_PATH = os.path.join("nlp", "vader_cache.sqlite")
+# Texts per task sent to a worker; large enough that pickling is noise next to scoring
+BATCH_SIZE = 2000
+# Fewer texts than this to score are done in this process: starting workers would cost more
+MIN_PARALLEL = 2 * BATCH_SIZE
+# Bound on "?" parameters per SQLite statement
+SQLITE_VARS = 900
+
+_analyzer = None
+
+
+def content_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _init_worker():
+    # one analyzer per process: loading the lexicon is the expensive part of creating it
+    global _analyzer
+    _analyzer = SentimentIntensityAnalyzer()
+
+
+def _score_batch(texts):
+    if _analyzer is None:
+        _init_worker()
+    return [_analyzer.polarity_scores(text)["compound"] for text in texts]
+
+
+def _scorer():
+    try:
+        return f"vaderSentiment {version('vaderSentiment')}"
+    except PackageNotFoundError:
+        return "vaderSentiment"
+
+
+class ScoreCache:
+    """content hash → compound score, in SQLite; emptied when the VADER version changes."""
+
+    def __init__(self, path=CACHE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS scores (hash TEXT PRIMARY KEY, compound REAL NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'scorer'").fetchone()
+        if row is None or row[0] != _scorer():
+            # another lexicon / version can score the same text differently
+            self.conn.execute("DELETE FROM scores")
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('scorer', ?)", (_scorer(),))
+        self.conn.commit()
+
+    def get_many(self, hashes):
+        found = {}
+        for i in range(0, len(hashes), SQLITE_VARS):
+            chunk = hashes[i:i + SQLITE_VARS]
+            placeholders = ",".join("?" * len(chunk))
+            found.update(self.conn.execute(
+                f"SELECT hash, compound FROM scores WHERE hash IN ({placeholders})", chunk))
+        return found
+
+    def put_many(self, items):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO scores (hash, compound) VALUES (?, ?)", items)
+
+    def close(self):
+        self.conn.close()
+
+
+def score_texts(texts, workers=None, batch_size=BATCH_SIZE, cache_path=CACHE_PATH):
+    """
+    VADER compound score of every text, in order. Texts already in the cache are not
+    scored again; the rest are split into batches over a process pool (one analyzer per
+    worker) and added to the cache batch by batch. cache_path=None disables the cache.
+    Returns (scores, stats).
+    """
+    start = time.perf_counter()
+    texts = [str(t) for t in texts]
+    hashes = [content_hash(t) for t in texts]
+
+    cache = ScoreCache(cache_path) if cache_path else None
+    known = cache.get_many(list(set(hashes))) if cache else {}
+    todo = {}
+    for h, text in zip(hashes, texts):
+        if h not in known:
+            todo.setdefault(h, text)
+    cached = len(texts) - sum(1 for h in hashes if h in todo)
+
+    todo_hashes, todo_texts = list(todo), list(todo.values())
+    batches = [todo_texts[i:i + batch_size] for i in range(0, len(todo_texts), batch_size)]
+    workers = workers or os.cpu_count() or 1
+    if len(todo_texts) < MIN_PARALLEL or workers == 1:
+        results = map(_score_batch, batches)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(batches)), initializer=_init_worker,
+                                   mp_context=multiprocessing.get_context("spawn"))
+        results = pool.map(_score_batch, batches)
+    try:
+        for i, batch_scores in enumerate(results):
+            batch_hashes = todo_hashes[i * batch_size:(i + 1) * batch_size]
+            known.update(zip(batch_hashes, batch_scores))
+            if cache:
+                cache.put_many(zip(batch_hashes, batch_scores))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if cache:
+            cache.close()
+
+    seconds = time.perf_counter() - start
+    stats = {
+        "texts": len(texts),
+        "cached": cached,
+        "scored": len(todo_texts),
+        "workers": 1 if pool is None else min(workers, len(batches)),
+        "seconds": seconds,
+        "texts_per_second": len(texts) / max(seconds, 1e-9),
+    }
+    return [known[h] for h in hashes], stats
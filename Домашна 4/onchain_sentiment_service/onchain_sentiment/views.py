@@ -1,20 +1,37 @@
-import threading
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from .pipeline import run_pipeline
+from .jobs import registry
 
 
 # Create your views here.
 
 @csrf_exempt
-@require_http_methods(["POST"])
+@require_http_methods(["GET", "POST"])
 def onchain_sentiment_api(request):
-    thread = threading.Thread(target=run_pipeline)
-    thread.daemon = True
-    thread.start()
+    """
+    POST starts the pipeline, or joins the run already in progress (same job_id);
+    ?force=1 reruns stages whose inputs are unchanged. GET returns the latest job.
+    """
+    if request.method == "GET":
+        job = registry.latest()
+        if job is None:
+            return JsonResponse({"status": "idle", "message": "No pipeline run yet"}, status=404)
+        return JsonResponse(job)
 
+    force = request.GET.get("force") == "1" or request.POST.get("force") == "1"
+    job, started = registry.submit(force=force)
     return JsonResponse({
-        "status": "started",
-        "message": "Pipeline running in background"
-    })
+        "status": "started" if started else "already_running",
+        "message": "Pipeline running in background" if started else "Joined the pipeline run in progress",
+        "job_id": job["job_id"],
+        "job": job,
+    }, status=202)
+
+
+@require_http_methods(["GET"])
+def onchain_sentiment_job(request, job_id):
+    job = registry.get(job_id)
+    if job is None:
+        return JsonResponse({"status": "unknown", "message": f"No job {job_id}"}, status=404)
+    return JsonResponse(job)